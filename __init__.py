@@ -44,7 +44,9 @@ It allows for the generation of simple rectangle, disk and ellipse shapes.
    :lines: 23-
 
 All these features are of course still available with the more advanced
-``Shape`` object which inherits from :class:`shapely.geometry.Polygon`.
+``Shape`` object which inherits from :class:`shapely.geometry.Polygon` (with
+shapely < 2) or wraps it (with shapely >= 2, where geometries cannot be
+subclassed).
 
 
 Complex shapes from files
@@ -62,18 +64,23 @@ import logging
 
 # shapely support
 
+_shapely2 = False
+
 try:
     import shapely
-    from shapely import speedups
-    if speedups.available:
-        speedups.enable()
+    _shapely2 = int(shapely.__version__.split(".")[0]) >= 2
+    if not _shapely2:
+        # speedups are always enabled (and deprecated) in shapely 2
+        from shapely import speedups
+        if speedups.available:
+            speedups.enable()
     _shapely_support = True
     from .shape import Shape, Area
 except ImportError:
     _shapely_support = False
     from .backup_shape import BackupShape as Shape
 
-from .tools import pop_largest
+from .tools import pop_largest, spawn
 
 
 __version__ = "0.7.2"
@@ -99,7 +106,9 @@ if _shapely_support:
     shapes_from_file = _sff
 
 
-__all__ = ["Shape", "culture_from_file", "pop_largest", "shapes_from_file"]
+__all__ = [
+    "Shape", "culture_from_file", "pop_largest", "shapes_from_file", "spawn"
+]
 
 
 # ------------------------------------------ #
@@ -25,10 +25,9 @@ Backup Shape implementation using scipy.
 import weakref
 
 import numpy as np
-from numpy.random import uniform
 import scipy.spatial as sptl
 
-from .tools import _backup_contains
+from .tools import _backup_contains, _get_rng
 
 try:
     from .units import _unit_support
@@ -243,6 +242,7 @@ class BackupShape:
         self._unit     = unit
 
         self._return_quantity = False
+        self._rng             = None
 
         self._points      = None
         self._bounds      = None
@@ -291,6 +291,16 @@ class BackupShape:
     def geom_type(self):
         return self._geom_type
 
+    @property
+    def rng(self):
+        '''
+        Default random number generator of the :class:`Shape` (None if the
+        global NumPy state is used).
+
+        .. versionadded:: 0.7
+        '''
+        return self._rng
+
     @property
     def return_quantity(self):
         '''
@@ -303,6 +313,20 @@ class BackupShape:
     def set_parent(self, parent):
         self._parent = weakref.proxy(parent) if parent is not None else None
 
+    def set_rng(self, rng):
+        '''
+        Set the default random number generator of the :class:`Shape` (used by
+        :func:`seed_neurons` when no `rng` is passed).
+
+        .. versionadded:: 0.7
+
+        Parameters
+        ----------
+        rng : int, :class:`numpy.random.Generator`, SeedSequence or None
+            Generator or seed; if None, the global NumPy state is used.
+        '''
+        self._rng = None if rng is None else _get_rng(rng)
+
     def set_return_units(self, b):
         '''
         Set the default behavior for positions returned by `seed_neurons`.
@@ -337,7 +361,7 @@ class BackupShape:
         raise NotImplementedError("Not available with backup shape.")
 
     def seed_neurons(self, neurons=None, xmin=None, xmax=None, ymin=None,
-                     ymax=None, unit=None, return_quantity=False):
+                     ymax=None, unit=None, return_quantity=False, rng=None):
         '''
         Return the positions of the neurons inside the
         :class:`Shape`.
@@ -366,6 +390,10 @@ class BackupShape:
         return_quantity : bool, optional (default: False)
             Whether the positions should be returned as ``pint.Quantity``
             objects (requires Pint); `unit` must be provided.
+        rng : int, :class:`numpy.random.Generator`, optional (default: None)
+            Random number generator (or seed) used for this call. Defaults to
+            the generator set through :func:`Shape.set_rng`, or to the global
+            NumPy state if none was set.
 
         Returns
         -------
@@ -377,6 +405,8 @@ class BackupShape:
 
         positions = np.zeros((neurons, 2))
 
+        rng = _get_rng(rng, self._rng)
+
         return_quantity = (self._return_quantity
                            if return_quantity is None else return_quantity)
 
@@ -411,13 +441,13 @@ class BackupShape:
         max_y = min(ymax, max_y)
         # test case
         if self._geom_type == "Rectangle":
-            xx = uniform(min_x, max_x, size=neurons)
-            yy = uniform(min_y, max_y, size=neurons)
+            xx = rng.uniform(min_x, max_x, size=neurons)
+            yy = rng.uniform(min_y, max_y, size=neurons)
             positions = np.vstack((xx, yy)).T
         elif (self._geom_type == "Disk"
               and (xmin, ymin, xmax, ymax) == self.bounds):
-            theta = uniform(0, 2*np.pi, size=neurons)
-            r = self.radius*np.sqrt(uniform(0, 0.99, size=neurons))
+            theta = rng.uniform(0, 2*np.pi, size=neurons)
+            r = self.radius*np.sqrt(rng.uniform(0, 0.99, size=neurons))
             positions = np.vstack(
                 (r*np.cos(theta) + self.centroid[0],
                  r*np.sin(theta) + self.centroid[1])).T
@@ -426,8 +456,8 @@ class BackupShape:
             # take some precaution to stay inside the shape
             r2 = 0.99*np.square(self.radius)
             while num_valid < neurons:
-                xx = uniform(min_x, max_x, size=neurons-num_valid)
-                yy = uniform(min_y, max_y, size=neurons-num_valid)
+                xx = rng.uniform(min_x, max_x, size=neurons-num_valid)
+                yy = rng.uniform(min_y, max_y, size=neurons-num_valid)
                 rr2 = np.square(xx-self.centroid[0]) + \
                       np.square(yy-self.centroid[1])
                 idx_valid = rr2 <= r2
@@ -444,8 +474,8 @@ class BackupShape:
             e = c / a 
             num_valid = 0
             while num_valid < neurons:
-                xx = uniform(min_x, max_x, size=neurons-num_valid)
-                yy = uniform(min_y, max_y, size=neurons-num_valid)
+                xx = rng.uniform(min_x, max_x, size=neurons-num_valid)
+                yy = rng.uniform(min_y, max_y, size=neurons-num_valid)
                 thetas = np.arctan2(yy-self.centroid[1], xx-self.centroid[0])
                 dist_centroid = np.sqrt(np.square(xx-self.centroid[0]) + \
                                          np.square(yy-self.centroid[1]))
@@ -22,6 +22,8 @@
 Geometry utility functions.
 '''
 
+import numpy as np
+
 
 _di_mag = {
     'um': 1e-6,
@@ -38,3 +40,697 @@ def conversion_magnitude(source_unit, target_unit):
     values in `target_unit`.
     '''
     return _di_mag[source_unit] / _di_mag[target_unit]
+
+
+def points_in_rings(x, y, rings, max_block=2**22):
+    '''
+    Vectorized even-odd point-in-polygon test.
+
+    A point is inside if a horizontal ray starting from it crosses the edges
+    of `rings` an odd number of times, so that passing the exterior and the
+    interiors of a polygon (or of several polygons) correctly handles the
+    holes.
+    Points lying on an edge are outside, as with the `contains` predicate of
+    shapely.
+    Points are first filtered by the bounding box of the rings, then both
+    points and edges are binned into horizontal strips so that each point
+    is only tested against the edges that can intersect its ray.
+
+    .. versionadded:: 0.7
+
+    Parameters
+    ----------
+    x, y : arrays of floats of length N
+        Coordinates of the points.
+    rings : list of arrays of shape (M, 2)
+        Closed rings (the last point repeats the first one).
+    max_block : int, optional (default: 2**22)
+        Maximum number of point/edge pairs processed at once.
+
+    Returns
+    -------
+    inside : boolean array of length N
+    '''
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+
+    inside = np.zeros(len(x), dtype=bool)
+
+    if not len(rings) or not len(x):
+        return inside
+
+    starts = np.concatenate([np.asarray(r, dtype=float)[:-1, :2]
+                             for r in rings])
+    ends   = np.concatenate([np.asarray(r, dtype=float)[1:, :2]
+                             for r in rings])
+
+    if not len(starts):
+        return inside
+
+    x1, y1 = starts[:, 0], starts[:, 1]
+    x2, y2 = ends[:, 0], ends[:, 1]
+
+    elo, ehi = np.minimum(y1, y2), np.maximum(y1, y2)
+    y0, yh   = elo.min(), ehi.max()
+    xh       = max(x1.max(), x2.max())
+    x0       = min(x1.min(), x2.min())
+
+    # bounding box prefiltering
+    ids = np.flatnonzero((x >= x0) & (x <= xh) & (y >= y0) & (y <= yh))
+
+    if not len(ids):
+        return inside
+
+    # bin edges and points into horizontal strips
+    num_strips = int(np.clip(len(starts) // 4, 1, 4096))
+    height     = (yh - y0) / num_strips if yh > y0 else 1.
+
+    def _strip(val):
+        return np.clip(((val - y0) / height).astype(int), 0, num_strips - 1)
+
+    s0, s1 = _strip(elo), _strip(ehi)
+    counts = s1 - s0 + 1
+    eids   = np.repeat(np.arange(len(starts)), counts)
+    first  = np.repeat(np.cumsum(counts) - counts, counts)
+    strips = np.repeat(s0, counts) + np.arange(len(eids)) - first
+
+    order  = np.argsort(strips, kind="stable")
+    eids   = eids[order]
+    ebound = np.concatenate(
+        ([0], np.cumsum(np.bincount(strips, minlength=num_strips))))
+
+    pstrip = _strip(y[ids])
+    order  = np.argsort(pstrip, kind="stable")
+    ids    = ids[order]
+    pbound = np.concatenate(
+        ([0], np.cumsum(np.bincount(pstrip, minlength=num_strips))))
+
+    for k in np.flatnonzero(np.diff(pbound) * np.diff(ebound)):
+        edges = eids[ebound[k]:ebound[k + 1]]
+        ex1, ey1 = x1[edges], y1[edges]
+        ex2, ey2 = x2[edges], y2[edges]
+        dx, dy   = ex2 - ex1, ey2 - ey1
+        xlo, xhi = np.minimum(ex1, ex2), np.maximum(ex1, ex2)
+        ylo, yhi = elo[edges], ehi[edges]
+
+        points = ids[pbound[k]:pbound[k + 1]]
+        step   = max(1, max_block // len(edges))
+
+        for i in range(0, len(points), step):
+            pid    = points[i:i + step]
+            px, py = x[pid, None], y[pid, None]
+
+            # the ray crosses the straddling edges that are on the right of
+            # the point: side > 0 for upward edges and side < 0 for
+            # downward ones (horizontal edges never straddle the ray)
+            side     = dx*(py - ey1) - dy*(px - ex1)
+            straddle = (ey1 > py) != (ey2 > py)
+            crossing = straddle & ((side > 0) == (dy > 0))
+
+            odd = (np.count_nonzero(crossing, axis=1) % 2) == 1
+
+            # points lying on an edge are outside
+            pts, eds = np.nonzero(side == 0)
+            on_edge  = (px[pts, 0] >= xlo[eds]) & (px[pts, 0] <= xhi[eds]) \
+                       & (py[pts, 0] >= ylo[eds]) & (py[pts, 0] <= yhi[eds])
+
+            odd[pts[on_edge]] = False
+
+            inside[pid] = odd
+
+    return inside
+
+
+def rings_to_cells(rings, origin, resolution, shape):
+    '''
+    Mark the cells of a regular grid that are crossed by the edges of
+    `rings`.
+
+    Edges are cut into pieces smaller than the `resolution`, so that the
+    bounding box of each piece covers at most 2 x 2 cells, which are all
+    marked; the result is therefore conservative (cells close to an edge can
+    be marked even if the edge does not cross them).
+
+    .. versionadded:: 0.7
+
+    Parameters
+    ----------
+    rings : list of arrays of shape (M, 2)
+        Closed rings (the last point repeats the first one).
+    origin : tuple of 2 floats
+        Position of the lower left corner of the grid.
+    resolution : float
+        Size of the square cells.
+    shape : tuple of 2 ints
+        Number of rows (along y) and columns (along x) of the grid.
+
+    Returns
+    -------
+    crossed : boolean array of shape `shape`
+    '''
+    crossed = np.zeros(shape, dtype=bool)
+
+    if not len(rings):
+        return crossed
+
+    _, cells = _segment_cells(*_ring_edges(rings), origin=origin,
+                              resolution=resolution, shape=shape)
+
+    crossed.flat[cells] = True
+
+    return crossed
+
+
+def _ring_edges(rings):
+    '''
+    Returns the starts and ends of the edges of `rings`, as two arrays of
+    shape (E, 2).
+    '''
+    starts = np.concatenate([np.asarray(r, dtype=float)[:-1, :2]
+                             for r in rings])
+    ends   = np.concatenate([np.asarray(r, dtype=float)[1:, :2]
+                             for r in rings])
+
+    return starts, ends
+
+
+def _segment_cells(starts, ends, origin, resolution, shape):
+    '''
+    Returns the pairs ``(segment, cell)`` such that the segment may cross
+    the cell (cells are numbered in C order); a pair can appear several
+    times.
+
+    Segments are cut into pieces whose extent along x and y is smaller
+    than the `resolution`, so that the bounding box of each piece covers at
+    most 2 x 2 cells, which are all returned; cells outside the grid are
+    ignored.
+    '''
+    # the bounding boxes are slightly enlarged to be safe with respect to
+    # rounding errors
+    eps = 1e-9*resolution
+
+    def _box_cells(a, b):
+        lo = np.floor((np.minimum(a, b) - eps - origin) / resolution)
+        hi = np.floor((np.maximum(a, b) + eps - origin) / resolution)
+        return lo.astype(int), hi.astype(int)
+
+    lo, hi = _box_cells(starts, ends)
+    sids   = np.arange(len(starts))
+
+    # cut the segments spanning more than 2 cells into pieces smaller than
+    # the resolution
+    cut = np.flatnonzero(np.any(hi - lo > 1, axis=1))
+
+    if len(cut):
+        vec     = ends[cut] - starts[cut]
+        extents = np.max(np.abs(vec), axis=1)
+        pieces  = (np.floor(extents / (0.9*resolution)) + 1).astype(np.int64)
+
+        pids  = np.repeat(np.arange(len(cut)), pieces)
+        first = np.repeat(np.cumsum(pieces) - pieces, pieces)
+        rank  = np.arange(len(pids)) - first
+        delta = vec[pids] / pieces[pids, None]
+
+        pstart = starts[cut][pids] + rank[:, None]*delta
+        plo, phi = _box_cells(pstart, pstart + delta)
+
+        keep = np.ones(len(starts), dtype=bool)
+        keep[cut] = False
+
+        sids = np.concatenate((sids[keep], cut[pids]))
+        lo   = np.concatenate((lo[keep], plo))
+        hi   = np.concatenate((hi[keep], phi))
+
+    num_rows, num_cols = shape
+
+    owners, cells = [], []
+
+    wide = hi[:, 0] != lo[:, 0]
+    tall = hi[:, 1] != lo[:, 1]
+
+    for a, i in enumerate((lo[:, 0], hi[:, 0])):
+        for b, j in enumerate((lo[:, 1], hi[:, 1])):
+            keep = (i >= 0) & (i < num_cols) & (j >= 0) & (j < num_rows)
+
+            # skip the corners that repeat the lower-left cell
+            if a:
+                keep &= wide
+            if b:
+                keep &= tall
+
+            owners.append(sids[keep])
+            cells.append(j[keep]*num_cols + i[keep])
+
+    return np.concatenate(owners), np.concatenate(cells)
+
+
+class _EdgeGrid(object):
+
+    '''
+    Uniform grid storing the edges of a set of rings, used to find the
+    first edge crossed by many segments at once.
+
+    .. versionadded:: 0.7
+    '''
+
+    #: Maximum number of segments processed at once.
+    block_size = 2**15
+
+    def __init__(self, rings, origin, cell_size, shape):
+        self.origin    = np.asarray(origin, dtype=float)
+        self.cell_size = float(cell_size)
+        self.shape     = tuple(shape)
+
+        self.starts, self.ends = _ring_edges(rings)
+
+        self._qx, self._qy = self.starts[:, 0].copy(), self.starts[:, 1].copy()
+        self._sx = self.ends[:, 0] - self.starts[:, 0]
+        self._sy = self.ends[:, 1] - self.starts[:, 1]
+
+        # compressed list of the edges of each cell
+        edges, cells = _segment_cells(self.starts, self.ends, self.origin,
+                                      self.cell_size, self.shape)
+
+        num_cells = self.shape[0]*self.shape[1]
+        pairs     = np.unique(edges*num_cells + cells)
+        edges     = pairs // num_cells
+        cells     = pairs % num_cells
+
+        order = np.argsort(cells, kind="stable")
+
+        self._edges   = edges[order]
+        self._offsets = np.concatenate(([0], np.cumsum(
+            np.bincount(cells, minlength=self.shape[0]*self.shape[1]))))
+
+    @property
+    def bounds(self):
+        ''' Bounds of the grid, as (xmin, ymin, xmax, ymax). '''
+        xmin, ymin = self.origin
+        num_rows, num_cols = self.shape
+
+        return (xmin, ymin, xmin + num_cols*self.cell_size,
+                ymin + num_rows*self.cell_size)
+
+    def first_crossing(self, starts, ends, return_edges=False):
+        '''
+        Returns, for each segment going from `starts` to `ends`, the
+        position ``0 < t <= 1`` of its first crossing with an edge along the
+        segment (``start + t*(end - start)``), or infinity if it does not
+        cross any edge.
+        Segments that are parallel to an edge do not cross it.
+
+        The segments are first clipped to the grid, so the cost does not
+        depend on their length outside of it.
+
+        If `return_edges` is True, the index of the first edge crossed by
+        each segment (-1 if none) is also returned.
+        '''
+        starts = np.asarray(starts, dtype=float)
+        ends   = np.asarray(ends, dtype=float)
+
+        t     = np.full(len(starts), np.inf)
+        edges = np.full(len(starts), -1, dtype=int)
+
+        t0, t1 = self._clip(starts, ends)
+
+        # only the segments entering the grid can cross an edge
+        todo = np.flatnonzero(t0 <= t1)
+        t0   = t0[todo, None]
+        t1   = t1[todo, None]
+        vec  = ends[todo] - starts[todo]
+
+        # keep the original points when they are not clipped
+        cstarts = np.where(t0 > 0, starts[todo] + t0*vec, starts[todo])
+        cends   = np.where(t1 < 1, starts[todo] + t1*vec, ends[todo])
+
+        t0, t1 = t0.ravel(), t1.ravel()
+
+        for i in range(0, len(todo), self.block_size):
+            block = slice(i, i + self.block_size)
+
+            tc, edges[todo[block]] = self._first_crossing(
+                cstarts[block], cends[block])
+
+            # back to the positions along the original segments
+            hit    = np.flatnonzero(np.isfinite(tc))
+            first  = t0[block][hit]
+            length = t1[block][hit] - first
+
+            t[todo[block][hit]] = first + tc[hit]*length
+
+        if return_edges:
+            return t, edges
+
+        return t
+
+    def _clip(self, starts, ends):
+        '''
+        Liang-Barsky clipping of the segments to the grid: returns the
+        positions ``t0`` and ``t1`` of the part of each segment that lies
+        inside the grid (empty if ``t0 > t1``).
+        '''
+        xmin, ymin, xmax, ymax = self.bounds
+
+        t0 = np.zeros(len(starts))
+        t1 = np.ones(len(starts))
+
+        vec = ends - starts
+
+        for axis, lo, hi in ((0, xmin, xmax), (1, ymin, ymax)):
+            p, d = starts[:, axis], vec[:, axis]
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ta = (lo - p) / d
+                tb = (hi - p) / d
+
+            # segments parallel to the side are either inside or outside
+            parallel = d == 0
+            outside  = parallel & ((p < lo) | (p > hi))
+
+            t0 = np.where(parallel, t0, np.maximum(t0, np.minimum(ta, tb)))
+            t1 = np.where(parallel, t1, np.minimum(t1, np.maximum(ta, tb)))
+
+            t1[outside] = -1.
+
+        return t0, t1
+
+    def _first_crossing(self, starts, ends):
+        t     = np.full(len(starts), np.inf)
+        edges = np.full(len(starts), -1, dtype=int)
+
+        sids, cells = _segment_cells(starts, ends, self.origin,
+                                     self.cell_size, self.shape)
+
+        # candidate (segment, edge) pairs, from the non-empty cells
+        counts = self._offsets[cells + 1] - self._offsets[cells]
+        keep   = counts > 0
+        sids   = sids[keep]
+        cells  = cells[keep]
+        counts = counts[keep]
+
+        if not len(sids):
+            return t, edges
+
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        eids  = self._edges[np.repeat(self._offsets[cells], counts)
+                            + np.arange(len(first)) - first]
+        sids  = np.repeat(sids, counts)
+
+        # intersection of p + t*r with q + u*s: the crossing happens for
+        # 0 < t <= 1 and 0 <= u <= 1, with t = tnum / denom and
+        # u = unum / denom
+        rx, ry = ends[:, 0] - starts[:, 0], ends[:, 1] - starts[:, 1]
+
+        rx, ry = rx[sids], ry[sids]
+        sx, sy = self._sx[eids], self._sy[eids]
+
+        qpx = self._qx[eids] - starts[sids, 0]
+        qpy = self._qy[eids] - starts[sids, 1]
+
+        denom = rx*sy - ry*sx
+        sign  = np.sign(denom)
+        denom = np.abs(denom)
+        tnum  = sign*(qpx*sy - qpy*sx)
+        unum  = sign*(qpx*ry - qpy*rx)
+
+        hit = (denom > 0) & (tnum > 0) & (tnum <= denom) & (unum >= 0) \
+              & (unum <= denom)
+
+        sids = sids[hit]
+        eids = eids[hit]
+        tt   = tnum[hit] / denom[hit]
+
+        # keep the first crossing of each segment
+        order = np.lexsort((tt, sids))
+        first = order[np.flatnonzero(np.diff(sids[order], prepend=-1))]
+
+        t[sids[first]]     = tt[first]
+        edges[sids[first]] = eids[first]
+
+        return t, edges
+
+
+class _EdgeTree(object):
+
+    '''
+    Exact nearest-point queries on the edges of a set of rings.
+
+    Edges are cut into pieces no longer than `max_length` and the middles of
+    the pieces are stored in a k-d tree; for each point, the pieces are
+    tested by increasing distance of their middles until none of the
+    remaining ones can be closer than the best piece found.
+
+    .. versionadded:: 0.7
+    '''
+
+    #: Maximum number of points processed at once.
+    block_size = 2**16
+
+    def __init__(self, rings, max_length):
+        from scipy.spatial import cKDTree
+
+        starts, ends = _ring_edges(rings)
+
+        lengths = np.linalg.norm(ends - starts, axis=1)
+        pieces  = np.maximum(
+            np.ceil(lengths / max_length), 1).astype(np.int64)
+
+        eids  = np.repeat(np.arange(len(starts)), pieces)
+        first = np.repeat(np.cumsum(pieces) - pieces, pieces)
+        rank  = np.arange(len(eids)) - first
+        delta = (ends - starts)[eids] / pieces[eids, None]
+
+        self.starts = starts[eids] + rank[:, None]*delta
+        self.ends   = self.starts + delta
+        self._half  = 0.5*np.max(np.linalg.norm(delta, axis=1))
+        self._tree  = cKDTree(0.5*(self.starts + self.ends))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def nearest(self, x, y):
+        '''
+        Returns the distances from the points (x, y) to the edges, together
+        with the closest points on the edges, as an array of shape (N, 2).
+        '''
+        points    = np.column_stack((np.ravel(x), np.ravel(y)))
+        distances = np.empty(len(points))
+        closest   = np.empty((len(points), 2))
+
+        for i in range(0, len(points), self.block_size):
+            block = slice(i, i + self.block_size)
+            distances[block], closest[block] = self._nearest(points[block])
+
+        return distances, closest
+
+    def _nearest(self, points):
+        num_pieces = len(self.starts)
+
+        distances = np.empty(len(points))
+        closest   = np.empty((len(points), 2))
+
+        todo = np.arange(len(points))
+        k    = min(8, num_pieces)
+
+        while len(todo):
+            p = points[todo]
+
+            dk, ik = self._tree.query(p, k=k)
+            dk, ik = dk.reshape(len(p), k), ik.reshape(len(p), k)
+
+            # exact distances to the k pieces with the closest middles
+            a  = self.starts[ik]
+            ab = self.ends[ik] - a
+            ap = p[:, None, :] - a
+
+            norm = np.sum(ab*ab, axis=2)
+            norm[norm == 0] = 1.
+
+            t = np.clip(np.sum(ap*ab, axis=2) / norm, 0, 1)
+            c = a + t[..., None]*ab
+            d = np.linalg.norm(p[:, None, :] - c, axis=2)
+
+            best = np.argmin(d, axis=1)
+            rows = np.arange(len(p))
+
+            distances[todo] = d[rows, best]
+            closest[todo]   = c[rows, best]
+
+            # a piece whose middle is further than the k-th one is at least
+            # at dk - half from the point
+            done = dk[:, -1] - self._half >= distances[todo]
+
+            if k == num_pieces:
+                break
+
+            todo = todo[~done]
+            k    = min(4*k, num_pieces)
+
+        return distances, closest
+
+
+class _BBoxGrid(object):
+
+    '''
+    Uniform grid hashing the bounding boxes of named geometries, used to find
+    quickly the geometries whose boxes intersect a given box.
+
+    Boxes spanning more than `max_cells` cells are kept apart and returned
+    by every query.
+
+    .. versionadded:: 0.7
+    '''
+
+    max_cells = 1024
+
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self._cells    = {}
+        self._bounds   = {}
+        self._order    = {}
+        self._large    = set()
+        self._count    = 0
+
+    def __contains__(self, key):
+        return key in self._bounds
+
+    def __len__(self):
+        return len(self._bounds)
+
+    def _cell_range(self, bounds):
+        c = self.cell_size
+        return (int(np.floor(bounds[0] / c)), int(np.floor(bounds[1] / c)),
+                int(np.floor(bounds[2] / c)), int(np.floor(bounds[3] / c)))
+
+    def insert(self, key, bounds):
+        '''
+        Insert (or update) the box of `key`; empty boxes are ignored.
+        '''
+        if key in self._bounds:
+            self.remove(key)
+
+        if len(bounds) != 4 or np.any(np.isnan(bounds)):
+            return
+
+        self._bounds[key] = tuple(bounds)
+        self._order[key]  = self._count
+        self._count      += 1
+
+        i0, j0, i1, j1 = self._cell_range(bounds)
+
+        if (i1 - i0 + 1)*(j1 - j0 + 1) > self.max_cells:
+            self._large.add(key)
+        else:
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    self._cells.setdefault((i, j), set()).add(key)
+
+    def remove(self, key):
+        ''' Remove `key` from the grid (does nothing if it is absent). '''
+        bounds = self._bounds.pop(key, None)
+
+        if bounds is None:
+            return
+
+        del self._order[key]
+
+        if key in self._large:
+            self._large.discard(key)
+            return
+
+        i0, j0, i1, j1 = self._cell_range(bounds)
+
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                cell = self._cells[(i, j)]
+                cell.discard(key)
+                if not cell:
+                    del self._cells[(i, j)]
+
+    def query(self, bounds):
+        '''
+        Returns the keys whose boxes intersect `bounds`, by insertion order.
+        '''
+        if len(bounds) != 4 or np.any(np.isnan(bounds)):
+            return []
+
+        xmin, ymin, xmax, ymax = bounds
+
+        found = set(self._large)
+
+        i0, j0, i1, j1 = self._cell_range(bounds)
+
+        if (i1 - i0 + 1)*(j1 - j0 + 1) > len(self._cells):
+            # the query is large, scan the occupied cells instead
+            for (i, j), keys in self._cells.items():
+                if i0 <= i <= i1 and j0 <= j <= j1:
+                    found.update(keys)
+        else:
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    found.update(self._cells.get((i, j), ()))
+
+        # exact test on the boxes
+        keys = []
+
+        for k in found:
+            b = self._bounds[k]
+            if b[0] <= xmax and b[2] >= xmin and b[1] <= ymax \
+               and b[3] >= ymin:
+                keys.append(k)
+
+        return sorted(keys, key=self._order.get)
+
+    def query_points(self, x, y):
+        '''
+        Returns a dict associating each key to the indices of the points
+        (`x`, `y`) that are located inside its box.
+
+        Points are grouped by cell so that each box is only tested against
+        the points of the cells it covers.
+        '''
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+
+        found = {}
+
+        if len(x) == 0 or not self._bounds:
+            return found
+
+        # group the points by cell
+        i = np.floor(x / self.cell_size).astype(np.int64)
+        j = np.floor(y / self.cell_size).astype(np.int64)
+
+        imin, jmin = i.min(), j.min()
+        num_j      = j.max() - jmin + 1
+
+        cell_ids, inverse = np.unique((i - imin)*num_j + (j - jmin),
+                                      return_inverse=True)
+
+        order  = np.argsort(inverse, kind="stable")
+        splits = np.cumsum(np.bincount(inverse, minlength=len(cell_ids)))
+
+        candidates = {}
+
+        for cid, members in zip(cell_ids, np.split(order, splits[:-1])):
+            cell = (int(cid // num_j + imin), int(cid % num_j + jmin))
+            for key in self._cells.get(cell, ()):
+                candidates.setdefault(key, []).append(members)
+
+        for key in self._large:
+            candidates[key] = [np.arange(len(x))]
+
+        # exact test on the boxes
+        for key in sorted(candidates, key=self._order.get):
+            ids = np.concatenate(candidates[key])
+            b   = self._bounds[key]
+            px  = x[ids]
+            py  = y[ids]
+
+            ids = ids[(px >= b[0]) & (px <= b[2])
+                      & (py >= b[1]) & (py <= b[3])]
+
+            if len(ids):
+                found[key] = ids
+
+        return found
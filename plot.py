@@ -81,13 +81,16 @@ def plot_shape(shape, axis=None, m='', mc="#999999", fc="#8888ff",
     if "zorder" in kwargs:
         del kwargs["zorder"]
 
+    # Shape and Area wrap their geometry with shapely >= 2
+    geometry = getattr(shape, "geometry", shape)
+
     # plot the main shape
-    if isinstance(shape, MultiPolygon):
-        for p in shape:
+    if isinstance(geometry, MultiPolygon):
+        for p in geometry.geoms:
             plot_shape(p, axis=axis, m=m, mc=mc, fc=fc, ec=ec, alpha=alpha,
                        brightness=brightness, show=False,
                        show_contour=show_contour, **kwargs)
-    elif isinstance(shape, Polygon) and shape.exterior.coords:
+    elif isinstance(geometry, Polygon) and shape.exterior.coords:
         if show_contour:
             _plot_coords(axis, shape.exterior, m, mc, ec)
             for path in shape.interiors:
@@ -133,8 +136,8 @@ def plot_shape(shape, axis=None, m='', mc="#999999", fc="#8888ff",
                         area, color=color, alpha=local_alpha, zorder=zorder,
                         **kwargs)
                     axis.add_patch(patch)
-    elif isinstance(shape, (LineString, MultiLineString)):
-        lines = [shape] if isinstance(shape, LineString) else shape.geoms
+    elif isinstance(geometry, (LineString, MultiLineString)):
+        lines = [shape] if isinstance(geometry, LineString) else shape.geoms
         for line in lines:
             _plot_coords(axis, line.coords, m, mc, ec)
 
@@ -23,7 +23,9 @@ Shape implementation using the
 `shapely <http://toblerity.org/shapely/index.html>`_ library.
 """
 
+import hashlib
 import weakref
+from types import MappingProxyType
 from copy import deepcopy
 import logging
 
@@ -32,13 +34,19 @@ logger = logging.getLogger(__name__)
 import shapely
 from shapely.wkt import loads
 from shapely.affinity import scale, translate
-from shapely.geometry import Point, Polygon, MultiPolygon
+from shapely.geometry import Point, Polygon, MultiPolygon, box
+from shapely.ops import unary_union
+from shapely.prepared import prep
 
 import numpy as np
-from numpy.random import uniform
 
-from .geom_utils import conversion_magnitude
-from .tools import indexable, pop_largest, _insert_area
+from . import _shapely2
+from .geom_utils import (conversion_magnitude, rings_to_cells, _BBoxGrid,
+                         _EdgeGrid, _EdgeTree)
+from .tools import (indexable, pop_largest, _contains_xy, _get_rng,
+                    _insert_area, _remove_area, _to_magnitude,
+                    _geometry_rings, _transformed_copies, _unwrap, _wrap,
+                    _GeometryProxy, _LRUCache)
 
 # unit support
 
@@ -47,19 +55,21 @@ try:
 except ImportError:
     _unit_support = False
 
-# opengl support
+# triangulation (uses OpenGL if available, pure NumPy otherwise)
 
-try:
-    from .triangulate import triangulate, rnd_pts_in_tr
-    _opengl_support = True
-except ImportError:
-    _opengl_support = False
+from .triangulate import (BoxSampler, DiskSampler, RejectionSampler,
+                          TriangleSampler, parallel_sample,
+                          poisson_disk_sample, triangulate_mesh)
 
 
 __all__ = ["Area", "Shape"]
 
 
-class Shape(Polygon):
+# shapely >= 2 geometries cannot be subclassed, Shape wraps them instead
+_ShapeBase = _GeometryProxy if _shapely2 else Polygon
+
+
+class Shape(_ShapeBase):
     """
     Class containing the shape of the area where neurons will be distributed to
     form a network.
@@ -75,9 +85,54 @@ class Shape(Polygon):
 
     See also
     --------
-    Parent class: :class:`shapely.geometry.Polygon`
+    Parent class: :class:`shapely.geometry.Polygon` with shapely < 2; with
+    shapely >= 2, the Shape wraps the polygon (see :attr:`Shape.geometry`)
+    and forwards its attributes and methods.
     """
 
+    #: Maximum number of seed regions kept in the triangulation cache.
+    seed_cache_size = 16
+
+    #: Seed regions are sampled by rejection in their bounding box rather
+    #: than triangulated if their number of vertices, multiplied by the
+    #: fraction of their bounding box that they cover, exceeds this value.
+    rejection_vertices = 2000
+
+    #: Relative tolerance on the area of the triangulation of a seed region,
+    #: beyond which rejection sampling is used instead.
+    triangulation_rtol = 1e-6
+
+    #: Number of consecutive rejections after which the random placement of
+    #: obstacles stops (see :func:`Shape.random_obstacles`).
+    rsa_max_failures = 10000
+
+    #: Number of cells along the largest side of the signed distance field
+    #: (see :func:`Shape.distance_to_boundary`).
+    distance_field_cells = 256
+
+    #: Number of cells along the largest side of the grid storing the edges
+    #: of the shape and its areas (see :func:`Shape.segments_cross`).
+    edge_grid_cells = 256
+
+    _seed_cache = None
+    _rng        = None
+    _area_index = None
+    _prepared   = None
+
+    # rasterized areas, see `build_label_grid`
+    _label_grid       = None
+    _label_resolution = None
+
+    # signed distance field, see `distance_to_boundary`
+    _distance_field = None
+
+    # grid of the edges, see `segments_cross`
+    _edge_grid = None
+
+    # memoized geometric properties, see `_memoize`
+    _geom_version = 0
+    _memo         = None
+
     @staticmethod
     def from_file(filename, min_x=None, max_x=None, unit='um', parent=None,
                   interpolate_curve=50, default_properties=None):
@@ -142,6 +197,8 @@ class Shape(Polygon):
         default_properties : dict, optional (default: None)
             Default properties of the environment.
         '''
+        polygon = _unwrap(polygon)
+
         assert isinstance(polygon, Polygon), "`polygon` is not a Polygon " +\
             "but a {}.".format(polygon.__class__)
 
@@ -161,11 +218,10 @@ class Shape(Polygon):
             leftmost   = np.min(ext[:, 0])
             rightmost  = np.max(ext[:, 0])
             scaling    = (max_x - min_x) / (rightmost - leftmost)
-            obj        = scale(polygon, scaling, scaling)
+            obj        = _wrap(Shape, scale(polygon, scaling, scaling))
         else:
-            obj = Polygon(polygon)
+            obj = _wrap(Shape, polygon)
 
-        obj.__class__         = Shape
         obj._parent           = None
         obj._unit             = unit
         obj._geom_type        = g_type
@@ -418,6 +474,65 @@ class Shape(Polygon):
         }
         super(Shape, self).__init__(shell, holes=holes)
 
+    @property
+    def geometry(self):
+        '''
+        Underlying shapely geometry (the object itself with shapely < 2).
+
+        .. versionadded:: 0.7
+        '''
+        return _unwrap(self)
+
+    @property
+    def bounds(self):
+        '''
+        Bounding box (min_x, min_y, max_x, max_y) of the shape.
+
+        .. versionchanged:: 0.7
+            Computed once per modification of the geometry.
+        '''
+        return self._memoize("bounds")
+
+    @property
+    def area(self):
+        '''
+        Area of the shape.
+
+        .. versionchanged:: 0.7
+            Computed once per modification of the geometry.
+        '''
+        return self._memoize("area")
+
+    @property
+    def centroid(self):
+        '''
+        Centroid of the shape, as a :class:`shapely.geometry.Point`.
+
+        .. versionchanged:: 0.7
+            Computed once per modification of the geometry.
+        '''
+        return self._memoize("centroid")
+
+    @property
+    def length(self):
+        '''
+        Perimeter of the shape (including the holes).
+
+        .. versionchanged:: 0.7
+            Computed once per modification of the geometry.
+        '''
+        return self._memoize("length")
+
+    @property
+    def exterior_coords(self):
+        '''
+        Read-only array of shape (N, 2) containing the coordinates of the
+        exterior of the shape (the first point is repeated at the end).
+
+        .. versionadded:: 0.7
+        '''
+        return self._memoize("exterior_coords")
+
     @property
     def parent(self):
         ''' Return the parent of the :class:`Shape`. '''
@@ -433,36 +548,55 @@ class Shape(Polygon):
     @property
     def areas(self):
         '''
-        Returns the dictionary containing the Shape's areas.
+        Returns a read-only view of the dictionary containing the Shape's
+        areas.
+
+        .. versionchanged:: 0.7
+            Returns a view instead of a deep copy (areas are not copied); use
+            :func:`copy_areas` to get independent copies.
         '''
-        return deepcopy(self._areas)
+        return MappingProxyType(self._areas)
 
     @property
     def default_areas(self):
         '''
-        Returns the dictionary containing only the default areas.
+        Returns a read-only dictionary containing only the default areas.
 
         .. versionadded:: 0.4
+
+        .. versionchanged:: 0.7
+            Areas are no longer copied (see :func:`copy_areas`).
         '''
-        areas = {
-            k: deepcopy(v) for k,v in self._areas.items()
+        return MappingProxyType({
+            k: v for k, v in self._areas.items()
             if k.find("default_area") == 0
-        }
-        return areas
+        })
 
     @property
     def non_default_areas(self):
         '''
-        Returns the dictionary containing all Shape's areas except the
+        Returns a read-only dictionary containing all Shape's areas except the
         default ones.
 
         .. versionadded:: 0.4
+
+        .. versionchanged:: 0.7
+            Areas are no longer copied (see :func:`copy_areas`).
         '''
-        areas = {
-            k: deepcopy(v) for k,v in self._areas.items()
+        return MappingProxyType({
+            k: v for k, v in self._areas.items()
             if k.find("default_area") != 0
-        }
-        return areas
+        })
+
+    @property
+    def rng(self):
+        '''
+        Default random number generator of the :class:`Shape` (None if the
+        global NumPy state is used).
+
+        .. versionadded:: 0.7
+        '''
+        return self._rng
 
     @property
     def return_quantity(self):
@@ -473,6 +607,25 @@ class Shape(Polygon):
         '''
         return self._return_quantity
 
+    def copy_areas(self, names=None):
+        '''
+        Returns a dictionary containing independent copies of the Shape's
+        areas.
+
+        .. versionadded:: 0.7
+
+        Parameters
+        ----------
+        names : str or list, optional (default: all areas)
+            Name(s) of the areas that should be copied.
+        '''
+        if names is None:
+            names = list(self._areas)
+        elif isinstance(names, str):
+            names = [names]
+
+        return {k: deepcopy(self._areas[k]) for k in names}
+
     def add_area(self, area, height=None, name=None, properties=None,
                  override=False):
         '''
@@ -497,8 +650,11 @@ class Shape(Polygon):
             be reduced in consequence.
         '''
         # check that area and self overlap
-        assert self.overlaps(area) or self.contains(area), "`area` must be " +\
-            "contained or at least overlap with the current shape."
+        prepared = self._prep()
+        geom     = _unwrap(area)
+        assert prepared.overlaps(geom) or prepared.contains(geom), \
+            "`area` must be contained or at least overlap with the " +\
+            "current shape."
         # check units
         if _unit_support:
             from .units import Q_
@@ -508,22 +664,24 @@ class Shape(Polygon):
         # the default area.
         intersection = self.intersection(area)
         if not override:
-            for key, other_area in self._areas.items():
-                if key.find("default_area") == -1:
-                    assert not intersection.overlaps(other_area), \
-                        "Different areas of a given Shape should not overlap."
+            for key in self._areas_near(intersection.bounds):
+                assert not self._areas[key]._prep().overlaps(intersection), \
+                    "Different areas of a given Shape should not overlap."
         else:
             delete = []
-            for key, other_area in self.non_default_areas.items():
-                if other_area.overlaps(area) or other_area.contains(area):
+            for key in self._areas_near(area.bounds):
+                other_area = self._areas[key]
+                other_prep = other_area._prep()
+                if other_prep.overlaps(geom) or other_prep.within(geom) \
+                        or other_prep.contains(geom):
                     new_existing = other_area.difference(area)
-                    if new_existing.empty():
+                    if new_existing.is_empty:
                         delete.append(key)
                     else:
                         _insert_area(self, key, new_existing,
                                      other_area.height, other_area.properties)
             for key in delete:
-                del self._areas[key]
+                _remove_area(self, key)
 
         # check properties
         if name is None:
@@ -552,27 +710,257 @@ class Shape(Polygon):
             # create the area
             _insert_area(self, name, intersection, height, properties)
 
+        self._geometry_changed()
+
+    def add_areas(self, areas, override=False):
+        '''
+        Add several new areas to the :class:`Shape` at once.
+
+        This is equivalent to calling :func:`add_area` for each area, but
+        the default area is updated only once, against the union of all new
+        areas, and overlaps are checked through a spatial index, so that
+        adding many areas is much faster.
+
+        .. versionadded:: 0.7
+
+        Parameters
+        ----------
+        areas : list of tuples
+            Each entry is a tuple ``(area, name, height, properties)``, where
+            the last elements can be omitted or None and follow the same rules
+            as the arguments of :func:`add_area`.
+        override : bool, optional (default: False)
+            If True, the new areas will be made over existing areas that will
+            be reduced in consequence.
+
+        Note
+        ----
+        The new areas must not overlap one another.
+        '''
+        new_areas = []
+
+        xmin, ymin, xmax, ymax = self.bounds
+
+        index    = _BBoxGrid(max(xmax - xmin, ymax - ymin) / 32.)
+        prepared = self._prep()
+
+        for i, entry in enumerate(areas):
+            area, name, height, properties = \
+                (tuple(entry) + (None,)*3)[:4]
+
+            # check that area and self overlap
+            geom = _unwrap(area)
+            assert prepared.overlaps(geom) or prepared.contains(geom), \
+                "`area` must be contained or at least overlap with the " +\
+                "current shape."
+
+            # check units
+            if _unit_support:
+                from .units import Q_
+                if isinstance(height, Q_):
+                    height = height.m_as(self.unit)
+
+            # check properties
+            if name is None:
+                if isinstance(area, Area):
+                    name = area.name
+                else:
+                    name = "area{}".format(len(self._areas) + i)
+            if height is None and isinstance(area, Area):
+                height = area.height
+            if properties is None and isinstance(area, Area):
+                properties = area.properties
+
+            # check that the new areas do not overlap
+            for j in index.query(area.bounds):
+                assert not _unwrap(area).overlaps(new_areas[j][0]), \
+                    "Different areas of a given Shape should not overlap."
+
+            index.insert(i, area.bounds)
+            new_areas.append((_unwrap(area), name, height, properties))
+
+        self._add_areas(new_areas, override=override)
+
+    def _add_areas(self, areas, override=False):
+        '''
+        Insert several areas at once; the new areas must not overlap one
+        another.
+
+        The default area is updated only once and each existing area is
+        only compared to the union of the new areas that are close to it,
+        so that the cost is roughly linear in the number of areas.
+
+        Parameters
+        ----------
+        areas : list of tuples
+            Tuples ``(geometry, name, height, properties)`` describing each
+            new area. Areas that are outside the shape are ignored.
+        override : bool, optional (default: False)
+            Whether the new areas can override existing ones.
+        '''
+        default_area = self._areas["default_area"]
+        prepared     = self._prep()
+
+        # clip the new areas to the shape
+        new_areas = []
+
+        for geom, name, height, properties in areas:
+            if not prepared.contains(geom):
+                geom = self.intersection(geom)
+            if geom.area > 0:
+                if height is None:
+                    height = default_area.height
+                if properties is None:
+                    properties = {}
+                new_areas.append((geom, name, height, properties))
+
+        if not new_areas:
+            return
+
+        xmin, ymin, xmax, ymax = self.bounds
+
+        index = _BBoxGrid(max(xmax - xmin, ymax - ymin) / 32.)
+
+        candidates = set()
+
+        for i, entry in enumerate(new_areas):
+            index.insert(i, entry[0].bounds)
+            candidates.update(self._areas_near(entry[0].bounds))
+
+        # check or update the existing areas
+        delete = []
+
+        for key in [k for k in self._areas if k in candidates]:
+            other_area = self._areas[key]
+            other_prep = other_area._prep()
+            local      = unary_union(
+                [new_areas[i][0] for i in index.query(other_area.bounds)])
+            if not override:
+                assert not other_prep.overlaps(local), \
+                    "Different areas of a given Shape should not overlap."
+            elif other_prep.overlaps(local) or other_prep.within(local) \
+                    or other_prep.contains(local):
+                new_existing = other_area.difference(local)
+                if new_existing.is_empty:
+                    delete.append(key)
+                else:
+                    _insert_area(self, key, new_existing, other_area.height,
+                                 other_area.properties)
+
+        for key in delete:
+            _remove_area(self, key)
+
+        # update the default area once
+        new_default = default_area.difference(
+            unary_union([entry[0] for entry in new_areas]))
+
+        if not new_default.is_empty:
+            _insert_area(self, "default_area", new_default,
+                         default_area.height, default_area.properties)
+            for geom, name, height, properties in new_areas:
+                _insert_area(self, name, geom, height, properties)
+
+        self._geometry_changed()
+
     def add_hole(self, hole):
         '''
         Make a hole in the shape.
 
         .. versionadded:: 0.4
+
+        .. versionchanged:: 0.7
+            Calls :func:`add_holes`.
+        '''
+        self.add_holes([hole])
+
+    def add_holes(self, holes):
+        '''
+        Make several holes in the shape at once.
+
+        The holes are merged in a single union and only the areas whose
+        bounding boxes intersect the holes are updated, so that adding many
+        holes in one call is much faster than calling :func:`add_hole`
+        repeatedly.
+
+        .. versionadded:: 0.7
+
+        Parameters
+        ----------
+        holes : iterable of Polygons or MultiPolygons
+            The holes.
         '''
-        areas = self.areas.copy()
-        new_shape  = Shape.from_polygon(
+        holes = [_unwrap(h) for h in holes]
+
+        if not holes:
+            return
+
+        hole  = holes[0] if len(holes) == 1 else unary_union(holes)
+        parts = [p for h in holes
+                 for p in (h.geoms if hasattr(h, "geoms") else [h])]
+
+        default_area = self._areas["default_area"]
+
+        new_shape = Shape.from_polygon(
             self.difference(hole), unit=self.unit, parent=self.parent,
-            default_properties=areas["default_area"].properties)
+            default_properties=default_area.properties)
+
+        self._set_geometry(new_shape)
+
+        # update the default areas
+        for name, area in list(self.default_areas.items()):
+            _insert_area(self, name, area.difference(hole), area.height,
+                         area.properties)
+
+        # update the areas close to the holes
+        xmin, ymin, xmax, ymax = self.bounds
+
+        index      = _BBoxGrid(max(xmax - xmin, ymax - ymin) / 32.)
+        candidates = set()
+
+        for i, p in enumerate(parts):
+            index.insert(i, p.bounds)
+            candidates.update(self._areas_near(p.bounds))
 
-        self._geom             = new_shape._geom
-        new_shape._other_owned = True
+        for name in [k for k in self._areas if k in candidates]:
+            area  = self._areas[name]
+            local = unary_union(
+                [parts[i] for i in index.query(area.bounds)])
 
-        for name, area in areas.items():
-            if name.find("default_area") != 0:
-                _insert_area(self, name, area.difference(hole),
-                             area.height, area.properties)
+            if area._prep().intersects(local):
+                remaining = area.difference(local)
+                if remaining.is_empty:
+                    _remove_area(self, name)
+                else:
+                    _insert_area(self, name, remaining, area.height,
+                                 area.properties)
+
+        self._geometry_changed()
+
+    def _set_geometry(self, geometry):
+        '''
+        Replace the polygon of the Shape (areas are not updated).
+        '''
+        geometry = _unwrap(geometry)
+
+        # drop the prepared geometry before the old one is released, and
+        # the Rectangle/Disk fast paths which no longer apply
+        self._prepared       = None
+        self._geom_type      = "Polygon"
+        self._distance_field = None
+        self._edge_grid      = None
+        self._geom_version  += 1
+
+        if _shapely2:
+            self._geometry = geometry
+        else:
+            # take ownership of a copy of the GEOS geometry
+            geometry              = Polygon(geometry)
+            self._geom            = geometry._geom
+            geometry._other_owned = True
 
     def random_obstacles(self, n, form, params=None, heights=None,
-                         properties=None, etching=0, on_area=None):
+                         properties=None, etching=0, on_area=None, rng=None,
+                         placement="lattice", scales=None, rotate=False):
         '''
         Place random obstacles inside the shape.
 
@@ -583,7 +971,9 @@ class Shape(Polygon):
         n : int or float
             Number of obstacles if `n` is an :obj:`int`, otherwise represents
             the fraction of the shape's bounding box that should be occupied by
-             the obstacles' bounding boxes.
+            the obstacles' bounding boxes (for "lattice" `placement`), or the
+            target packing fraction, i.e. the fraction of the shape's area
+            covered by the obstacles (for "random" `placement`).
         form : str or Shape
             Form of the obstacles, among "disk", "ellipse", "rectangle", or a
             custom shape.
@@ -594,14 +984,43 @@ class Shape(Polygon):
         heights : float or list, optional (default: None)
             Heights of the obstacles. If None, the obstacle will considered as
             a "hole" in the structure, i.e. an uncrossable obstacle.
+            If "random" `placement` stops before the target is reached, only
+            the first entries of the `heights` and `properties` lists are
+            used.
         properties : dict or list, optional (default: None)
             Properties of the obstacles if they constitue areas (only used if
             `heights` is not None). If not provided and `heights` is not None,
             will default to the "default_area" properties.
         etching : float, optional (default: 0)
-            Etching of the obstacles' corners (rounded corners). Valid only
-            for 
+            Etching of the obstacles' corners (rounded corners), applied once
+            to the obstacle form before it is copied at each location.
+        rng : int, :class:`numpy.random.Generator`, optional (default: None)
+            Random number generator (or seed) used for this call. Defaults to
+            the generator set through :func:`Shape.set_rng`, or to the global
+            NumPy state if none was set.
+        placement : str, optional (default: "lattice")
+            Either "lattice", to place obstacles on the regular grid defined
+            by the bounding box of `form`, or "random" to place them by random
+            sequential adsorption: obstacles with random positions (and
+            optionally sizes and orientations) are added one after the other
+            if they do not overlap previous ones. Collisions are tested via a
+            spatial hash so the cost stays close to linear in the number of
+            obstacles. If the target cannot be reached after
+            :attr:`rsa_max_failures` consecutive rejections, a warning is
+            issued and the obstacles already placed are kept.
+        scales : float, callable or distribution, optional (default: 1)
+            Scaling factor of `form` for "random" `placement`: either a
+            constant, a callable ``scales(rng, size)`` returning `size`
+            factors, or a frozen :mod:`scipy.stats` distribution.
+        rotate : bool, optional (default: False)
+            Whether obstacles are randomly rotated for "random" `placement`.
+
+        .. versionchanged:: 0.7
+            Obstacles are created and inserted in bulk; `etching` applies to
+            each obstacle rather than to their union. Added the `placement`,
+            `scales` and `rotate` arguments.
         '''
+        rng         = _get_rng(rng, self._rng)
         form_center = None
 
         if heights is not None:
@@ -613,8 +1032,25 @@ class Shape(Polygon):
                     if isinstance(heights[0], Q_):
                         heights = [h.m_as(self.unit) for h in heights]
 
+        def _check_lengths(num, at_least=False):
+            # one entry per obstacle in the `heights` and `properties` lists
+            def _wrong(length):
+                return length < num if at_least else length != num
+
+            if hasattr(heights, "__len__") and _wrong(len(heights)):
+                raise RuntimeError("One `height` entry per obstacle is "
+                                   "required; expected "
+                                   "{} but got {}".format(num, len(heights)))
+
+            if properties is not None and not isinstance(properties, dict):
+                assert not _wrong(len(properties)), \
+                    "One `properties` entry per obstacle is  required; " +\
+                    "expected {} but got {}".format(num, len(properties))
+
         # check n
-        if not isinstance(n, np.integer):
+        if isinstance(n, (int, np.integer)):
+            _check_lengths(n)
+        else:
             assert n <= 1, "Filling fraction (floating point `n`) must be "  +\
                            "smaller or equal to 1."
 
@@ -627,53 +1063,74 @@ class Shape(Polygon):
             form = self.rectangle(**params)
         elif not isinstance(form, (Polygon, MultiPolygon, Shape, Area)):
             raise RuntimeError("Invalid form: '{}'.".format(form))
+
+        form = _unwrap(form)
         
         # get form center and center on (0, 0)
         xmin, ymin, xmax, ymax = form.bounds
         form_center            = (0.5*(xmax + xmin), 0.5*(ymax + ymin))
         form_width             = xmax - xmin
         form_height            = ymax - ymin
-        form_bbox_area         = float((xmax - xmin)*(ymax - ymin))
-
-        # get shape width and height
-        xmin, ymin, xmax, ymax = self.bounds
-        width                  = xmax - xmin
-        height                 = ymax - ymin
 
         if not np.allclose(form_center, (0, 0)):
             form = translate(form, -form_center[0], -form_center[1])
 
-        # create points where obstacles can be located
-        locations = []
-        on_width  = int(np.rint(width / form_width))
-        on_height = int(np.rint(height / form_height))
-        x_offset  = 0.5*(width - on_width*form_width)
-        y_offset  = 0.5*(height - on_height*form_height)
+        # etch the prototype once, then make one copy per location
+        if etching > 0:
+            form = form.buffer(-etching, cap_style=3).buffer(etching)
+
+        form_scales, angles = None, None
+
+        if placement == "random":
+            locations, form_scales, angles = self._rsa_locations(
+                form, n, scales, rotate, rng)
+
+            # placement can stop early, only keep the entries of the
+            # obstacles that were placed
+            n = len(locations)
 
-        for i in range(on_width):
-            for j in range(on_height):
-                x = xmin + x_offset + i*form_width
-                y = ymin + y_offset + j*form_height
-                locations.append((x, y))
+            _check_lengths(n, at_least=True)
 
-        # get elected locations
-        if not isinstance(n, np.integer):
-            n = int(np.rint(len(locations) * n))
+            if hasattr(heights, "__len__"):
+                heights = heights[:n]
 
-        indices   = list(range(len(locations)))
-        indices   = np.random.choice(indices, n, replace=False)
-        locations = [locations[i] for i in indices]
+            if properties is not None and not isinstance(properties, dict):
+                properties = properties[:n]
+        elif placement == "lattice":
+            # get shape width and height
+            xmin, ymin, xmax, ymax = self.bounds
+            width                  = xmax - xmin
+            height                 = ymax - ymin
+
+            # create points where obstacles can be located
+            on_width  = int(np.rint(width / form_width))
+            on_height = int(np.rint(height / form_height))
+            x_offset  = 0.5*(width - on_width*form_width)
+            y_offset  = 0.5*(height - on_height*form_height)
+
+            xx, yy = np.meshgrid(
+                xmin + x_offset + np.arange(on_width)*form_width,
+                ymin + y_offset + np.arange(on_height)*form_height,
+                indexing="ij")
+
+            locations = np.array([xx.ravel(), yy.ravel()]).T
+
+            # get elected locations
+            if not isinstance(n, (int, np.integer)):
+                n = int(np.rint(len(locations) * n))
+                _check_lengths(n)
+
+            locations = locations[
+                rng.choice(len(locations), n, replace=False)]
+        else:
+            raise ValueError("Invalid `placement`: '{}'.".format(placement))
 
         # check heights
         same_prop = []
         if heights is not None:
-            try:
-                if len(heights) != n:
-                    raise RuntimeError("One `height` entry per obstacle is "
-                                       "required; expected "
-                                       "{} but got {}".format(n, len(heights)))
+            if hasattr(heights, "__len__"):
                 same_prop.append(np.allclose(heights, heights[0]))
-            except TypeError:
+            else:
                 same_prop.append(True)
                 heights     = [heights for _ in range(n)]
 
@@ -682,9 +1139,6 @@ class Shape(Polygon):
             properties = (properties for _ in range(n))
             same_prop.append(True)
         elif properties is not None:
-            assert len(properties) == n, \
-                "One `properties` entry per obstacle is  required; " +\
-                "expected {} but got {}".format(n, len(properties))
             same_prop.append(True)
             for dic in properties:
                 same_prop[-1] *= (dic == properties[0])
@@ -702,47 +1156,198 @@ class Shape(Polygon):
 
         names = ["obstacle_{}".format(num_obstacles + i) for i in range(n)]
 
+        obstacles = _transformed_copies(form, locations, form_scales, angles)
+
+        def _merge(geoms):
+            if placement == "lattice":
+                return unary_union(geoms)
+            # random obstacles are disjoint, no need to compute the union
+            return MultiPolygon([
+                p for g in geoms
+                for p in (g.geoms if hasattr(g, "geoms") else [g])])
+
         # create the obstacles
         if heights is None:
-            new_form = Polygon()
-            for loc in locations:
-                new_form = new_form.union(translate(form, loc[0], loc[1]))
-            if etching > 0:
-                new_form = new_form.buffer(-etching, cap_style=3)
-                new_form = new_form.buffer(etching)
-            self.add_hole(new_form)
+            self.add_hole(_merge(obstacles))
+        elif np.all(same_prop):
+            # potentially contiguous areas
+            new_form = _merge(obstacles)
+            h        = next(iter(heights))
+            prop     = next(iter(properties))
+            prepared = self._prep()
+            if prepared.overlaps(new_form) or prepared.contains(new_form):
+                self.add_area(new_form, height=h, name="obstacle",
+                              properties=prop, override=True)
         else:
-            if np.all(same_prop):
-                # potentially contiguous areas
-                new_form = Polygon()
-                h        = next(iter(heights))
-                prop     = next(iter(properties))
-                for loc in locations:
-                    new_form = new_form.union(translate(form, loc[0], loc[1]))
-                if etching > 0:
-                    new_form = new_form.buffer(-etching, cap_style=3)
-                    new_form = new_form.buffer(etching)
-                if self.overlaps(new_form) or self.contains(new_form):
-                    self.add_area(new_form, height=h, name="obstacle",
-                                  properties=prop, override=True)
-            else:
-                # many separate areas
-                prop = (locations, heights, names, properties)
-                for loc, h, name, p in zip(*prop):
-                    new_form = translate(form, loc[0], loc[1])
-                    if etching > 0:
-                        new_form = new_form.buffer(-etching, cap_style=3)
-                        new_form = new_form.buffer(etching)
-                    if h is None:
-                        self.add_hole(new_form)
-                    elif self.overlaps(new_form) or self.contains(new_form):
-                            self.add_area(new_form, height=h, name=name,
-                                          properties=p, override=True)
+            # many separate areas, inserted in a single pass
+            holes, areas = [], []
+            prop         = (obstacles, heights, names, properties)
+            for obstacle, h, name, p in zip(*prop):
+                if h is None:
+                    holes.append(obstacle)
+                else:
+                    areas.append((obstacle, name, h, p))
+            if holes:
+                self.add_hole(_merge(holes))
+            self._add_areas(areas, override=True)
+
+    def _rsa_locations(self, form, n, scales, rotate, rng):
+        '''
+        Random sequential adsorption of copies of `form` (centered on the
+        origin) in the shape.
+
+        Candidates are tested against the circumscribed circles of the
+        obstacles already placed, which are stored in a spatial hash
+        (a dict of grid cells); the exact polygons are only compared if
+        the circles overlap and `form` is not a disk.
+        The packing fraction only accounts for the part of the obstacles
+        that lies inside the shape.
+
+        Returns
+        -------
+        locations : array of shape (N, 2)
+        scales, angles : arrays of N floats
+        '''
+        sampler  = self._seed_sampler(None, None, None, None, None, None, 0)
+        geometry = _unwrap(self)
+        prepared = self._prep()
+
+        coords  = np.concatenate([
+            np.asarray(p.exterior.coords)[:, :2]
+            for p in (form.geoms if hasattr(form, "geoms") else [form])])
+        radius0 = np.max(np.linalg.norm(coords, axis=1))
+        area0   = form.area
+        exact   = area0 < 0.99*np.pi*radius0*radius0  # not a disk
+
+        if isinstance(n, (int, np.integer)):
+            max_num, max_area = n, np.inf
+        else:
+            max_num, max_area = np.inf, n*self.area
+
+        def _draw_scales(size):
+            if scales is None:
+                return np.ones(size)
+            if hasattr(scales, "rvs"):
+                state = None if rng is np.random else rng
+                return np.asarray(scales.rvs(size=size, random_state=state))
+            if callable(scales):
+                return np.asarray(scales(rng, size), dtype=float)
+            return np.full(size, float(scales))
+
+        batch = 1024
+        cell  = None
+        grid  = {}
+
+        centers, radii, factors, angles, polygons = [], [], [], [], []
+
+        covered  = 0.
+        failures = 0
+        max_rad  = 0.
+
+        while len(centers) < max_num and covered < max_area \
+                and failures < self.rsa_max_failures:
+            positions = sampler.sample(batch, rng=rng)
+            sizes     = _draw_scales(batch)
+            thetas    = (rng.uniform(0, 2*np.pi, batch) if rotate
+                         else np.zeros(batch))
+
+            if cell is None:
+                cell = 2*radius0*np.median(sizes)
+
+            for (x, y), size, theta in zip(positions, sizes, thetas):
+                r     = radius0*size
+                reach = r + max_rad
+
+                i0, i1 = int(np.floor((x - reach) / cell)), \
+                         int(np.floor((x + reach) / cell))
+                j0, j1 = int(np.floor((y - reach) / cell)), \
+                         int(np.floor((y + reach) / cell))
+
+                candidate = None
+                overlap   = False
+
+                for i in range(i0, i1 + 1):
+                    for j in range(j0, j1 + 1):
+                        for k in grid.get((i, j), ()):
+                            cx, cy = centers[k]
+                            if (cx - x)**2 + (cy - y)**2 \
+                                    >= (radii[k] + r)**2:
+                                continue
+                            if exact:
+                                if candidate is None:
+                                    candidate = _transformed_copies(
+                                        form, [(x, y)], [size], [theta])[0]
+                                if polygons[k] is None:
+                                    polygons[k] = _transformed_copies(
+                                        form, [centers[k]], [factors[k]],
+                                        [angles[k]])[0]
+                                if not candidate.intersects(polygons[k]):
+                                    continue
+                            overlap = True
+                            break
+                        if overlap:
+                            break
+                    if overlap:
+                        break
+
+                if overlap:
+                    failures += 1
+                    if failures >= self.rsa_max_failures:
+                        break
+                    continue
+
+                failures = 0
+                key      = (int(np.floor(x / cell)), int(np.floor(y / cell)))
+
+                grid.setdefault(key, []).append(len(centers))
+                centers.append((x, y))
+                radii.append(r)
+                factors.append(size)
+                angles.append(theta)
+                polygons.append(candidate)
+
+                max_rad = max(max_rad, r)
+
+                # only count the part of the obstacle inside the shape
+                if prepared.contains(box(x - r, y - r, x + r, y + r)):
+                    covered += area0*size*size
+                else:
+                    if candidate is None:
+                        candidate = _transformed_copies(
+                            form, [(x, y)], [size], [theta])[0]
+                    covered += candidate.intersection(geometry).area
+
+                if len(centers) >= max_num or covered >= max_area:
+                    break
+
+        if len(centers) < max_num and covered < max_area:
+            logger.warning("Random obstacle placement stopped after {} "
+                           "consecutive failures: {} obstacles were placed "
+                           "(packing fraction {:.3f}).".format(
+                               failures, len(centers), covered / self.area))
+
+        return (np.array(centers).reshape(-1, 2), np.array(factors),
+                np.array(angles))
 
     def set_parent(self, parent):
         ''' Set the parent :class:`nngt.Graph`. '''
         self._parent = weakref.proxy(parent) if parent is not None else None
 
+    def set_rng(self, rng):
+        '''
+        Set the default random number generator of the :class:`Shape` (used by
+        :func:`seed_neurons` and
+        :func:`random_obstacles` when no `rng` is passed).
+
+        .. versionadded:: 0.7
+
+        Parameters
+        ----------
+        rng : int, :class:`numpy.random.Generator`, SeedSequence or None
+            Generator or seed; if None, the global NumPy state is used.
+        '''
+        self._rng = None if rng is None else _get_rng(rng)
+
     def set_return_units(self, b):
         '''
         Set the default behavior for positions returned by `seed_neurons`.
@@ -760,22 +1365,25 @@ class Shape(Polygon):
             raise RuntimeError("Cannot set 'return_quantity' to True as "
                                "`pint` is not installed.")
         self._return_quantity = b
-        for area in self.areas.values():
+        for area in self._areas.values():
             area._return_quantity = b
 
     def seed_neurons(self, neurons=None, container=None, on_area=None,
                      xmin=None, xmax=None, ymin=None, ymax=None, soma_radius=0,
-                     unit=None, return_quantity=None):
+                     unit=None, return_quantity=None, rng=None,
+                     num_threads=1, min_distance=None, density=None):
         '''
         Return the positions of the neurons inside the
         :class:`Shape`.
 
         Parameters
         ----------
-        neurons : int, optional (default: None)
+        neurons : int or dict, optional (default: None)
             Number of neurons to seed. This argument is considered only if the
             :class:`Shape` has no `parent`, otherwise, a position is generated
             for each neuron in `parent`.
+            A dict ``{area_name: number}`` seeds a given number of neurons in
+            each area; the area of each neuron is then also returned.
         container : :class:`Shape`, optional (default: None)
             Subshape acting like a mask, in which the neurons must be
             contained. The resulting area where the neurons are generated is
@@ -801,19 +1409,172 @@ class Shape(Polygon):
         return_quantity : bool, optional (default: False)
             Whether the positions should be returned as ``pint.Quantity``
             objects (requires Pint).
+        rng : int, :class:`numpy.random.Generator`, optional (default: None)
+            Random number generator (or seed) used for this call. Defaults to
+            the generator set through :func:`Shape.set_rng`, or to the global
+            NumPy state if none was set.
+        num_threads : int, optional (default: 1)
+            Number of threads used to generate the positions. If larger than
+            1, positions are generated by chunks with independent random
+            streams derived from `rng` (see
+            :func:`~PyNCulture.triangulate.parallel_sample`); the result then
+            does not depend on the number of threads, but differs from the
+            serial one.
+        min_distance : double, optional (default: None)
+            Minimal distance between two neurons (e.g. twice the soma radius
+            to prevent somata from overlapping). Positions are then generated
+            by a hard-core process (see
+            :func:`~PyNCulture.triangulate.poisson_disk_sample`) and a
+            RuntimeError is raised if the requested density cannot be
+            reached. This option is always serial (`num_threads` is ignored).
+        density : double, dict or str, optional (default: None)
+            Number of neurons per unit surface (in the unit of the Shape), used
+            instead of `neurons` to seed each area with a number of neurons
+            proportional to its surface. It can be the same for all areas
+            (restricted to `on_area` if provided), given per area as a dict
+            ``{area_name: density}``, or read from the area property of that
+            name (areas without this property receive no neurons). The area of
+            each neuron is then also returned.
 
         .. versionchanged:: 0.5
             Accepts `pint` units and `return_quantity` argument.
 
+        .. versionchanged:: 0.7
+            Added the `rng`, `num_threads`, `min_distance`, and `density`
+            arguments; `neurons` can be a dict.
+
         Note
         ----
         If both `container` and `on_area` are provided, the intersection of
         the two is used.
+        The seed region and its triangulation are cached, so that repeated
+        calls with the same arguments skip the geometric computations (the
+        cache is reset whenever areas or holes are added).
+
+        When seeding per area (dict `neurons` or `density`), all areas are
+        sampled in a single pass over a common triangulation where each
+        triangle is labelled by its area; positions are grouped by area.
 
         Returns
         -------
         positions : array of double with shape (N, 2) or `pint.Quantity` if
                     `return_quantity` is `True`.
+        areas : array of str of size N
+            Area of each neuron, only returned if `neurons` is a dict or if
+            `density` is provided.
+        '''
+        rng = _get_rng(rng, self._rng)
+
+        unit, return_quantity, xmin, xmax, ymin, ymax, soma_radius = \
+            self._seed_units(unit, return_quantity, xmin, xmax, ymin, ymax,
+                             soma_radius)
+
+        if isinstance(neurons, dict) or density is not None:
+            if min_distance is not None:
+                raise ValueError("`min_distance` cannot be used with "
+                                 "per-area seeding.")
+            return self._seed_by_area(
+                neurons, density, container, on_area, xmin, xmax, ymin, ymax,
+                soma_radius, unit, return_quantity, rng)
+
+        if neurons is None and self._parent is not None:
+            neurons = self._parent.node_nb()
+        if neurons is None:
+            raise ValueError("`neurons` cannot be None if `parent` is None.")
+
+        sampler = self._seed_sampler(
+            container, on_area, xmin, xmax, ymin, ymax, soma_radius)
+
+        if min_distance is not None:
+            if _unit_support:
+                from .units import Q_
+                if isinstance(min_distance, Q_):
+                    min_distance = min_distance.m_as(unit)
+            positions = poisson_disk_sample(
+                sampler, neurons, min_distance, rng=rng)
+        elif num_threads > 1:
+            positions = parallel_sample(
+                sampler, neurons, rng=rng, num_threads=num_threads)
+        else:
+            positions = sampler.sample(neurons, rng=rng)
+
+        return self._seed_output(positions, unit, return_quantity)
+
+    def iter_seed_neurons(self, neurons=None, chunk_size=100000,
+                          container=None, on_area=None, xmin=None, xmax=None,
+                          ymin=None, ymax=None, soma_radius=0, unit=None,
+                          return_quantity=None, rng=None, out=None):
+        '''
+        Generate the positions of the neurons inside the :class:`Shape` by
+        chunks, without building the full array in memory.
+
+        .. versionadded:: 0.7
+
+        Parameters
+        ----------
+        neurons : int, optional (default: None)
+            Total number of neurons to seed (number of neurons in `parent` if
+            None).
+        chunk_size : int, optional (default: 100000)
+            Number of positions yielded at each step (the last chunk can be
+            smaller).
+        out : str, array, or :class:`numpy.memmap`, optional (default: None)
+            If provided, the positions are written directly into it: either
+            an array of shape (`neurons`, 2), or the path of a ".npy" file
+            that will be created (and memory-mapped). Yielded chunks are then
+            views of `out`.
+
+        See :func:`seed_neurons` for the other arguments.
+
+        Yields
+        ------
+        positions : array of double with shape (`chunk_size`, 2) or
+                    `pint.Quantity` if `return_quantity` is `True`.
+
+        Note
+        ----
+        The generator must be consumed for the whole `out` array to be
+        filled, e.g. ``for _ in shape.iter_seed_neurons(n, out="pos.npy"):
+        pass``.
+        Since random numbers are drawn chunk by chunk, the positions differ
+        from those returned by :func:`seed_neurons` for the same `rng`.
+        '''
+        rng = _get_rng(rng, self._rng)
+
+        unit, return_quantity, xmin, xmax, ymin, ymax, soma_radius = \
+            self._seed_units(unit, return_quantity, xmin, xmax, ymin, ymax,
+                             soma_radius)
+
+        if neurons is None and self._parent is not None:
+            neurons = self._parent.node_nb()
+        if neurons is None:
+            raise ValueError("`neurons` cannot be None if `parent` is None.")
+
+        if isinstance(out, str):
+            out = np.lib.format.open_memmap(
+                out, mode="w+", dtype=float, shape=(neurons, 2))
+        elif out is not None:
+            assert np.shape(out) == (neurons, 2), \
+                "`out` must be of shape ({}, 2).".format(neurons)
+
+        sampler = self._seed_sampler(
+            container, on_area, xmin, xmax, ymin, ymax, soma_radius)
+
+        for start in range(0, neurons, chunk_size):
+            stop   = min(start + chunk_size, neurons)
+            buffer = None if out is None else out[start:stop]
+            chunk  = sampler.sample(stop - start, rng=rng, out=buffer)
+
+            yield self._seed_output(chunk, unit, return_quantity)
+
+        if isinstance(out, np.memmap):
+            out.flush()
+
+    def _seed_units(self, unit, return_quantity, xmin, xmax, ymin, ymax,
+                    soma_radius):
+        '''
+        Check the unit-related arguments of the seeding methods and return
+        them as magnitudes.
         '''
         return_quantity = (self._return_quantity
                            if return_quantity is None else return_quantity)
@@ -836,30 +1597,111 @@ class Shape(Polygon):
             if isinstance(soma_radius, Q_):
                 soma_radius = soma_radius.m_as(unit)
 
-        positions = None
-        if neurons is None and self._parent is not None:
-            neurons = self._parent.node_nb()
-        if neurons is None:
-            raise ValueError("`neurons` cannot be None if `parent` is None.")
+        return unit, return_quantity, xmin, xmax, ymin, ymax, soma_radius
+
+    def _seed_output(self, positions, unit, return_quantity):
+        '''
+        Convert the seeded positions to the requested unit.
+        '''
+        if unit is not None and unit != self._unit:
+            positions *= conversion_magnitude(unit, self._unit)
+
+        if _unit_support and return_quantity:
+            from .units import Q_
+            return positions * Q_("um" if unit is None else unit)
+
+        return positions
+
+    def _seed_by_area(self, neurons, density, container, on_area, xmin, xmax,
+                      ymin, ymax, soma_radius, unit, return_quantity, rng):
+        '''
+        Seed a given number or density of neurons in each area, returning
+        the positions and the area of each neuron.
+        '''
         if on_area is not None:
-            if not hasattr(on_area, '__iter__'):
+            if isinstance(on_area, str) or not hasattr(on_area, '__iter__'):
                 on_area = [on_area]
-        
-        min_x, min_y, max_x, max_y = self.bounds
 
-        custom_shape = (container is not None)
-        if container is None and on_area is None:
-            # set min/max
-            if xmin is None:
-                xmin = -np.inf
-            if ymin is None:
-                ymin = -np.inf
-            if xmax is None:
-                xmax = np.inf
-            if ymax is None:
-                ymax = np.inf
-            min_x = max(xmin, min_x)  # smaller that Shape max x
-            assert min_x <= self.bounds[2], "`min_x` must be inside Shape."
+        if isinstance(neurons, dict):
+            names = list(neurons)
+        elif isinstance(density, dict):
+            names = list(density)
+        elif on_area is not None:
+            names = list(on_area)
+        else:
+            names = list(self._areas)
+
+        for name in names:
+            if name not in self._areas:
+                raise ValueError("Unknown area: '{}'.".format(name))
+
+        window = None
+
+        if (xmin, xmax, ymin, ymax) != (None,)*4:
+            min_x, min_y, max_x, max_y = self.bounds
+            window = (min_x if xmin is None else max(xmin, min_x),
+                      min_y if ymin is None else max(ymin, min_y),
+                      max_x if xmax is None else min(xmax, max_x),
+                      max_y if ymax is None else min(ymax, max_y))
+
+        sampler = self._seed_labelled(container, names, window, soma_radius)
+
+        if isinstance(neurons, dict):
+            counts = [neurons[name] for name in names]
+        else:
+            if _unit_support:
+                from .units import Q_
+                inv_surface = "1 / {}**2".format(self._unit)
+                if isinstance(density, Q_):
+                    density = density.m_as(inv_surface)
+                elif isinstance(density, dict):
+                    density = {
+                        k: v.m_as(inv_surface) if isinstance(v, Q_) else v
+                        for k, v in density.items()
+                    }
+
+            if isinstance(density, dict):
+                dens = [density[name] for name in names]
+            elif isinstance(density, str):
+                dens = [self._areas[name].properties.get(density, 0)
+                        for name in names]
+            else:
+                dens = [density]*len(names)
+
+            counts = np.rint(
+                np.multiply(dens, sampler.label_areas)).astype(int)
+
+        positions, labels = sampler.sample_labels(counts, rng=rng)
+
+        return (self._seed_output(positions, unit, return_quantity),
+                np.array(names)[labels])
+
+    def _seed_sampler(self, container, on_area, xmin, xmax, ymin, ymax,
+                      soma_radius):
+        '''
+        Return the sampler generating uniform positions in the region defined
+        by the arguments of :func:`seed_neurons`.
+        '''
+        if on_area is not None:
+            if isinstance(on_area, str) or not hasattr(on_area, '__iter__'):
+                on_area = [on_area]
+
+        min_x, min_y, max_x, max_y = self.bounds
+
+        window = None
+
+        if container is None and on_area is None:
+            # set min/max
+            if xmin is None:
+                xmin = -np.inf
+            if ymin is None:
+                ymin = -np.inf
+            if xmax is None:
+                xmax = np.inf
+            if ymax is None:
+                ymax = np.inf
+            min_x = max(xmin, min_x)  # smaller that Shape max x
+            assert min_x <= self.bounds[2], "`min_x` must be inside Shape."
             min_y = max(ymin, min_y)  # smaller that Shape max y
             assert min_y <= self.bounds[3], "`min_y` must be inside Shape."
             max_x = min(xmax, max_x)  # larger that Shape min x
@@ -868,29 +1710,146 @@ class Shape(Polygon):
             assert max_y >= self.bounds[1], "`max_y` must be inside Shape."
             # remaining tests
             if self._geom_type == "Rectangle":
-                xx = uniform(
-                    min_x + soma_radius, max_x - soma_radius, size=neurons)
-                yy = uniform(
-                    min_y + soma_radius, max_y - soma_radius, size=neurons)
-                positions = np.vstack((xx, yy)).T
+                return BoxSampler(min_x + soma_radius, min_y + soma_radius,
+                                  max_x - soma_radius, max_y - soma_radius)
             elif (self._geom_type == "Disk"
                   and (xmin, ymin, xmax, ymax) == self.bounds):
-                theta = uniform(0, 2*np.pi, size=neurons)
-                # take some precaution to stay inside the shape
-                r = (self.radius - soma_radius) *\
-                    np.sqrt(uniform(0, 0.99, size=neurons))
-                positions = np.vstack(
-                    (r*np.cos(theta) + self.centroid[0],
-                     r*np.sin(theta) + self.centroid[1])).T
-            else:
-                custom_shape = True
-                container = Polygon([(min_x, min_y), (min_x, max_y),
-                                     (max_x, max_y), (max_x, min_y)])
-        elif on_area is not None:
-            custom_shape = True
-            area_shape   = Polygon()
+                return DiskSampler(self.centroid.coords[0],
+                                   self.radius - soma_radius)
+
+            window = (min_x, min_y, max_x, max_y)
+
+        return self._seed_region(container, on_area, window, soma_radius)[1]
+
+    def _seed_region(self, container, on_area, window, soma_radius):
+        '''
+        Return the region where neurons are seeded, together with the
+        :class:`~PyNCulture.triangulate.TriangleSampler` associated to its
+        triangulation, or a :class:`~PyNCulture.triangulate.RejectionSampler`
+        if the triangulation failed (or does not match the area of the
+        region, see :attr:`triangulation_rtol`) or if the region has many
+        vertices but covers most of its bounding box (see
+        :attr:`rejection_vertices`).
+
+        Results are stored in a bounded LRU cache keyed on the recipe of the
+        seed region, so repeated seedings of the same region only pay for
+        the random number generation.
+        '''
+        digest = None
+        if container is not None:
+            digest = hashlib.sha1(container.wkb).hexdigest()
+
+        key = (digest, None if on_area is None else tuple(sorted(on_area)),
+               window, float(soma_radius))
+
+        if self._seed_cache is None:
+            self._seed_cache = _LRUCache(self.seed_cache_size)
+
+        entry = self._seed_cache.get(key)
+
+        if entry is not None:
+            return entry
+
+        seed_area = self._seed_geometry(
+            container, on_area, window, soma_radius)
+
+        # porous regions with many vertices are faster to sample by
+        # rejection than to triangulate, unless most candidates are rejected
+        num_vertices = sum(len(r) for r in _geometry_rings(seed_area))
+        sampler      = None
+
+        if num_vertices > self.rejection_vertices:
+            sampler = RejectionSampler(seed_area)
+
+            if num_vertices*sampler.acceptance <= self.rejection_vertices:
+                sampler = None
+
+        if sampler is None:
+            try:
+                vertices, faces = triangulate_mesh(seed_area)
+                sampler = TriangleSampler(vertices[faces], geometry=seed_area)
+
+                error = abs(sampler.area - seed_area.area)
+
+                if error > self.triangulation_rtol*seed_area.area:
+                    raise ValueError(
+                        "relative area error {:.2e}".format(
+                            error / seed_area.area))
+            except ValueError as e:
+                logger.warning("Triangulation of the seed region failed "
+                               "({}), using rejection sampling.".format(e))
+                sampler = RejectionSampler(seed_area)
+
+        entry = (seed_area, sampler)
+        self._seed_cache.set(key, entry)
+
+        return entry
+
+    def _seed_labelled(self, container, names, window, soma_radius):
+        '''
+        Return a :class:`~PyNCulture.triangulate.TriangleSampler` over the
+        seed region, where each triangle is labelled by the index of its
+        area in `names`. Results are cached like in :func:`_seed_region`.
+        '''
+        digest = None
+        if container is not None:
+            digest = hashlib.sha1(container.wkb).hexdigest()
+
+        key = ("labelled", digest, tuple(names), window, float(soma_radius))
+
+        if self._seed_cache is None:
+            self._seed_cache = _LRUCache(self.seed_cache_size)
+
+        sampler = self._seed_cache.get(key)
+
+        if sampler is not None:
+            return sampler
+
+        seed_area = self._seed_geometry(container, names, window, soma_radius)
+
+        triangles, labels = [], []
+
+        for i, name in enumerate(names):
+            piece = seed_area.intersection(_unwrap(self._areas[name]))
+
+            if hasattr(piece, "geoms") and \
+               not isinstance(piece, MultiPolygon):
+                # drop the lines and points of a GeometryCollection
+                piece = MultiPolygon([g for g in piece.geoms
+                                      if isinstance(g, Polygon)])
+
+            if piece.area > 0:
+                vertices, faces = triangulate_mesh(piece)
+                triangles.append(vertices[faces])
+                labels.append(np.full(len(faces), i))
+
+        if not triangles:
+            raise ValueError("Empty area for seeding, check your `container` "
+                             "and min/max values.")
+
+        sampler = TriangleSampler(
+            np.concatenate(triangles), geometry=seed_area,
+            labels=np.concatenate(labels), num_labels=len(names))
+
+        self._seed_cache.set(key, sampler)
+
+        return sampler
+
+    def _seed_geometry(self, container, on_area, window, soma_radius):
+        '''
+        Compute the region where neurons are seeded.
+        '''
+        if window is not None:
+            min_x, min_y, max_x, max_y = window
+            box = Polygon([(min_x, min_y), (min_x, max_y),
+                           (max_x, max_y), (max_x, min_y)])
+            container = box if container is None \
+                        else box.intersection(_unwrap(container))
+
+        if on_area is not None:
+            area_shape = Polygon()
             for area in on_area:
-                area_shape = area_shape.union(self._areas[area])
+                area_shape = area_shape.union(_unwrap(self._areas[area]))
             if container is not None:
                 container = container.intersection(area_shape)
             else:
@@ -898,54 +1857,107 @@ class Shape(Polygon):
             assert container.area > 0, "`container` and `on_area` have " +\
                                        "empty intersection."
 
-        # enter here only if Polygon or `container` is not None
-        if custom_shape:
-            seed_area   = self.intersection(container)
-            area_buffer = seed_area.buffer(-soma_radius)
-            if not area_buffer.is_empty:
-                seed_area = area_buffer
-            assert not seed_area.is_empty, "Empty area for seeding, check " +\
-                "your `container` and min/max values."
-
-            if not isinstance(seed_area, (Polygon, MultiPolygon)):
-                raise ValueError("Invalid boundary value for seed region; "
-                                 "check that the min/max values you requested "
-                                 "are inside the shape.")
-
-            if _opengl_support:
-                triangles = []
-
-                if isinstance(seed_area, MultiPolygon):
-                    for g in seed_area.geoms:
-                        triangles.extend((Polygon(v) for v in triangulate(g)))
-                else:
-                    triangles = [Polygon(v) for v in triangulate(seed_area)]
+        seed_area   = self.intersection(container)
+        area_buffer = seed_area.buffer(-soma_radius)
+        if not area_buffer.is_empty:
+            seed_area = area_buffer
+        assert not seed_area.is_empty, "Empty area for seeding, check " +\
+            "your `container` and min/max values."
+
+        if not isinstance(seed_area, (Polygon, MultiPolygon)):
+            raise ValueError("Invalid boundary value for seed region; "
+                             "check that the min/max values you requested "
+                             "are inside the shape.")
+
+        return seed_area
+
+    def _areas_near(self, bounds):
+        '''
+        Returns the names of the non-default areas whose bounding boxes
+        intersect `bounds`.
+        '''
+        return self._area_grid().query(bounds)
+
+    def _area_grid(self):
+        '''
+        Returns the grid index of the bounding boxes of the non-default
+        areas, which is built on first use and then updated as areas are
+        inserted or removed.
+        '''
+        if self._area_index is None:
+            xmin, ymin, xmax, ymax = self.bounds
+            index = _BBoxGrid(max(xmax - xmin, ymax - ymin) / 32.)
+            for name, area in self._areas.items():
+                if name.find("default_area") != 0:
+                    index.insert(name, area.bounds)
+            self._area_index = index
+
+        return self._area_index
+
+    def _geometry_changed(self):
+        '''
+        Discard the data derived from the geometry (called whenever the
+        Shape or its areas are modified).
+        '''
+        self._prepared       = None
+        self._label_grid     = None
+        self._distance_field = None
+        self._edge_grid      = None
+        self._geom_version  += 1
+
+        if self._seed_cache is not None:
+            self._seed_cache.clear()
+
+    def _memoize(self, name):
+        '''
+        Returns the geometric property `name` of the underlying geometry,
+        computed only once for each version of the geometry.
+        '''
+        memo = self._memo
+
+        if memo is None or memo[0] != self._geom_version:
+            memo       = (self._geom_version, {})
+            self._memo = memo
+
+        values = memo[1]
 
-                positions = rnd_pts_in_tr(triangles, neurons)
+        if name not in values:
+            if name == "exterior_coords":
+                value = np.array(self._raw("exterior").coords)[:, :2]
+                value.flags.writeable = False
             else:
-                logger.warning("Random point generation can be very slow "
-                               "without advanced triangulation methods. "
-                               "Please install PyOpenGL for faster seeding "
-                               "inside complex shapes.")
-                points = []
-                p = Point()
-                while len(points) < neurons:
-                    new_x = uniform(min_x, max_x, neurons-len(points))
-                    new_y = uniform(min_y, max_y, neurons-len(points))
-                    for x, y in zip(new_x, new_y):
-                        p.coords = (x, y)
-                        if seed_area.contains(p):
-                            points.append((x, y))
-                positions = np.array(points)
+                value = self._raw(name)
 
-        if unit is not None and unit != self._unit:
-            positions *= conversion_magnitude(unit, self._unit)
+            values[name] = value
 
-        if _unit_support and return_quantity:
-            from .units import Q_
-            return positions * Q_("um" if unit is None else unit)
+        return values[name]
 
-        return positions
+    def _raw(self, name):
+        '''
+        Returns attribute `name` of the underlying geometry, bypassing the
+        memoized properties of the Shape.
+        '''
+        if _shapely2:
+            return getattr(self._geometry, name)
+
+        return getattr(Polygon, name).__get__(self, type(self))
+
+    def _prep(self):
+        '''
+        Returns the prepared geometry used for repeated predicates
+        (`contains`, `overlaps`, `intersects`...), built on first use and
+        discarded by :func:`_geometry_changed`.
+        '''
+        if self._prepared is None:
+            self._prepared = prep(_unwrap(self))
+
+        return self._prepared
+
+    def __getstate__(self):
+        # prepared geometries cannot be pickled nor copied
+        state = self.__dict__.copy()
+        state.pop("_prepared", None)
+        return state
 
     def contains_neurons(self, positions):
         '''
@@ -953,6 +1965,11 @@ class Shape(Polygon):
 
         .. versionadded:: 0.4
 
+        .. versionchanged:: 0.7
+            Vectorized test, also accepting `pint` quantities directly, and
+            using the label grid if one was built (see
+            :func:`build_label_grid`).
+
         Parameters
         ----------
         positions : point or 2D-array of shape (N, 2)
@@ -962,26 +1979,657 @@ class Shape(Polygon):
         contained : bool or 1D boolean array of length N
             True if the neuron is contained, False otherwise.
         '''
+        positions = _to_magnitude(positions, self._unit)
+        single    = (positions.ndim == 1 and positions.size > 0)
+        positions = positions.reshape(-1, 2)
+
+        x, y = positions[:, 0], positions[:, 1]
+
+        # with shapely >= 2, the geometry is prepared in place
+        geometry = self._prep().context
+        labels   = self._grid_lookup(x, y)
+
+        if labels is None:
+            contained = _contains_xy(geometry, x, y)
+        else:
+            exact     = np.flatnonzero(labels == -2)
+            contained = labels >= 0
+
+            contained[exact] = _contains_xy(geometry, x[exact], y[exact])
+
+        if single:
+            return bool(contained[0])
+
+        return contained
+
+    def which_area(self, positions):
+        '''
+        Find the area containing each position.
+
+        Candidate areas are found through a grid index of their bounding
+        boxes, then each area is tested only against the points inside its
+        box with a vectorized point-in-polygon test.
+        If a label grid was built (see :func:`build_label_grid`), only the
+        points located in the cells crossed by a boundary are tested.
+
+        .. versionadded:: 0.7
+
+        Parameters
+        ----------
+        positions : point or 2D-array of shape (N, 2)
+            Positions of the points (can be a `pint.Quantity`).
+
+        Returns
+        -------
+        indices : int or 1D array of N ints
+            Index of the area containing each point in `names`, -1 if the
+            point is outside the shape.
+        names : tuple of str
+            Names of the areas, in the order of :attr:`areas`.
+        '''
+        positions = _to_magnitude(positions, self._unit)
+        single    = (positions.ndim == 1 and positions.size > 0)
+        positions = positions.reshape(-1, 2)
+
+        x, y = positions[:, 0], positions[:, 1]
+
+        names   = tuple(self._areas)
+        indices = self._grid_lookup(x, y)
+
+        if indices is None:
+            indices = self._locate(x, y)
+        else:
+            exact = np.flatnonzero(indices == -2)
+            indices[exact] = self._locate(x[exact], y[exact])
+
+        if single:
+            return int(indices[0]), names
+
+        return indices, names
+
+    def property_at(self, positions, name):
+        '''
+        Value of an area property at each position.
+
+        The values of the property in every area are gathered in a single
+        array (in the order of :func:`which_area`) at each call, so that
+        changes made to the :class:`Area` objects are always taken into
+        account, then indexed by the area containing each point.
+        As for :attr:`Area.properties`, properties that are not set for an
+        area are equal to 1.
+
+        .. versionadded:: 0.7
+
+        Parameters
+        ----------
+        positions : point or 2D-array of shape (N, 2)
+            Positions of the points (can be a `pint.Quantity`).
+        name : str
+            Name of the property (see :func:`height_at` for the height of
+            the areas).
+
+        Returns
+        -------
+        values : float or 1D array of N floats
+            Value of the property in the area containing each point (NaN
+            outside the shape).
+        '''
+        indices, _ = self.which_area(positions)
+
+        column = _area_column([a._prop[name] for a in self._areas.values()])
+
+        return column[indices]
+
+    def height_at(self, positions):
+        '''
+        Height of the area at each position (see :func:`property_at`).
+
+        .. versionadded:: 0.7
+
+        Parameters
+        ----------
+        positions : point or 2D-array of shape (N, 2)
+            Positions of the points (can be a `pint.Quantity`).
+
+        Returns
+        -------
+        heights : float or 1D array of N floats
+            Height of the area containing each point (NaN outside the
+            shape).
+        '''
+        indices, _ = self.which_area(positions)
+
+        column = _area_column([a.height for a in self._areas.values()])
+
+        return column[indices]
+
+    def build_label_grid(self, resolution):
+        '''
+        Rasterize the areas of the shape on a regular grid of square cells.
+
+        Once the grid is built, :func:`which_area` and
+        :func:`contains_neurons` answer the queries by a simple array lookup
+        for the points located in cells which are not crossed by the
+        boundary of the shape or of one of its areas; only the points in
+        these boundary cells are tested exactly.
+        The grid is rebuilt automatically, on the next query, after areas or
+        holes are added.
+
+        .. versionadded:: 0.7
+
+        Parameters
+        ----------
+        resolution : float or `pint.Quantity`
+            Size of the cells, in the unit of the shape. If None, the grid
+            is removed.
+
+        Returns
+        -------
+        labels : read-only 2D array of ints of shape (num_rows, num_cols)
+            Index of the area containing each cell (as returned by
+            :func:`which_area`), -1 outside the shape. Cell ``[j, i]``
+            covers ``xmin + i*resolution <= x < xmin + (i+1)*resolution``
+            and ``ymin + j*resolution <= y < ymin + (j+1)*resolution``,
+            with (xmin, ymin) the lower-left corner of :attr:`bounds`.
+            The label of a boundary cell is the one of its center.
+        boundary : read-only 2D boolean array of shape (num_rows, num_cols)
+            Whether the cell is crossed by a boundary.
+        '''
+        self._label_grid = None
+
+        if resolution is None:
+            self._label_resolution = None
+            return None
+
         if _unit_support:
             from .units import Q_
-            if isinstance(positions, Q_):
-                positions = positions.m_as(self._unit)
-            elif len(positions):
-                if isinstance(positions[0], Q_):
-                    positions = np.array(
-                        [q.m_as(self._unit) for q in positions])
-                elif isinstance(positions[0][0], Q_):
-                    positions = np.array(
-                        [[q.m_as(self._unit) for q in row]
-                         for row in positions])
-
-        if np.shape(positions) == (len(positions), 2):
-            contained = []
-            for pos in positions:
-                contained.append(self.contains(Point(*pos)))
-            return np.array(contained, dtype=bool)
+            if isinstance(resolution, Q_):
+                resolution = resolution.m_as(self._unit)
+
+        assert resolution > 0, "`resolution` must be strictly positive."
+
+        self._label_resolution = float(resolution)
+
+        grid = self._get_label_grid()
+
+        return grid[2], grid[3]
+
+    def _get_label_grid(self):
+        '''
+        Returns the label grid ``(origin, resolution, labels, boundary,
+        lookup)``, building it if it was requested and is outdated, or None
+        if no grid was requested.
+        In `lookup`, boundary cells are set to -2.
+        '''
+        if self._label_grid is None and self._label_resolution is not None:
+            res = self._label_resolution
+
+            xmin, ymin, xmax, ymax = self.bounds
+
+            num_cols = max(int(np.ceil((xmax - xmin) / res)), 1)
+            num_rows = max(int(np.ceil((ymax - ymin) / res)), 1)
+
+            # exact labels of the cell centers
+            xx, yy = np.meshgrid(xmin + (np.arange(num_cols) + 0.5)*res,
+                                 ymin + (np.arange(num_rows) + 0.5)*res)
+
+            labels = self._locate(xx.ravel(), yy.ravel()).reshape(xx.shape)
+
+            # cells crossed by the boundaries of the shape and areas
+            rings = _geometry_rings(_unwrap(self))
+
+            for area in self._areas.values():
+                rings.extend(_geometry_rings(_unwrap(area)))
+
+            boundary = rings_to_cells(
+                rings, (xmin, ymin), res, (num_rows, num_cols))
+
+            lookup = np.where(boundary, -2, labels)
+
+            labels.flags.writeable   = False
+            boundary.flags.writeable = False
+
+            self._label_grid = ((xmin, ymin), res, labels, boundary, lookup)
+
+        return self._label_grid
+
+    def _grid_lookup(self, x, y):
+        '''
+        Returns the labels of the grid cells containing the points (x, y),
+        with -2 for points in boundary cells, or None if there is no label
+        grid.
+        '''
+        grid = self._get_label_grid()
+
+        if grid is None:
+            return None
+
+        (x0, y0), res, _, _, lookup = grid
+
+        num_rows, num_cols = lookup.shape
+
+        with np.errstate(invalid="ignore"):
+            i = np.floor((x - x0) / res)
+            j = np.floor((y - y0) / res)
+
+        # points outside the grid (or NaN) are outside the shape
+        valid  = (i >= 0) & (i < num_cols) & (j >= 0) & (j < num_rows)
+        labels = np.full(len(x), -1, dtype=int)
+
+        labels[valid] = lookup[j[valid].astype(int), i[valid].astype(int)]
+
+        return labels
+
+    def distance_to_boundary(self, positions, exact=None):
+        '''
+        Signed distance from each position to the boundary of the shape,
+        positive inside and negative outside, together with its gradient.
+
+        For a :class:`Shape`, the boundary is made of the walls (exterior
+        and holes); for an :class:`Area`, it also contains the interfaces
+        with the neighbouring areas.
+
+        Distances are interpolated from a signed distance field, computed
+        once on a grid of :attr:`distance_field_cells` cells along the
+        largest side of the shape, and rebuilt after areas or holes are
+        added. Exact distances are obtained from a k-d tree over the edges.
+        Cells where the interpolation is inaccurate (close to the boundary,
+        or straddling a ridge of the field such as the medial axis) are
+        always computed exactly unless `exact` is False.
+
+        .. versionadded:: 0.7
+
+        Parameters
+        ----------
+        positions : point or 2D-array of shape (N, 2)
+            Positions of the points (can be a `pint.Quantity`).
+        exact : bool, optional (default: None)
+            Whether the distances should be computed exactly for all points
+            (True), or interpolated for all the points located on the grid
+            (False). By default, points closer than two cells to the
+            boundary or in a ridge cell, as well as points outside the grid,
+            are computed exactly and the others are interpolated.
+
+        Returns
+        -------
+        distances : float or 1D array of N floats
+            Signed distances to the boundary.
+        gradients : array of shape (2,) or (N, 2)
+            Gradients of the signed distances (unit vectors pointing away
+            from the closest boundary point for the points inside, toward
+            it for the points outside, zero on the boundary).
+        '''
+        positions = _to_magnitude(positions, self._unit)
+        single    = (positions.ndim == 1 and positions.size > 0)
+        positions = positions.reshape(-1, 2)
+
+        x, y = positions[:, 0], positions[:, 1]
+
+        tree, (x0, y0), res, field, ridge = self._get_distance_field()
+
+        distances = np.full(len(x), np.nan)
+        gradients = np.zeros((len(x), 2))
+
+        if exact:
+            todo = np.arange(len(x))
         else:
-            return self.contains(Point(*positions))
+            num_rows, num_cols = field.shape
+
+            fx = (x - x0) / res
+            fy = (y - y0) / res
+
+            # cells of the grid (the last row/column of nodes is included)
+            on_grid = np.flatnonzero((fx >= 0) & (fx <= num_cols - 1)
+                                     & (fy >= 0) & (fy <= num_rows - 1))
+
+            i = np.minimum(fx[on_grid].astype(int), num_cols - 2)
+            j = np.minimum(fy[on_grid].astype(int), num_rows - 2)
+
+            tx = fx[on_grid] - i
+            ty = fy[on_grid] - j
+
+            f00, f10 = field[j, i], field[j, i + 1]
+            f01, f11 = field[j + 1, i], field[j + 1, i + 1]
+
+            # bilinear interpolation
+            distances[on_grid] = (
+                (1 - ty)*((1 - tx)*f00 + tx*f10) + ty*((1 - tx)*f01 + tx*f11))
+
+            gradients[on_grid, 0] = ((1 - ty)*(f10 - f00)
+                                     + ty*(f11 - f01)) / res
+            gradients[on_grid, 1] = ((1 - tx)*(f01 - f00)
+                                     + tx*(f11 - f10)) / res
+
+            if exact is None:
+                near = np.isnan(distances)
+
+                near[on_grid] = (np.abs(distances[on_grid]) < 2*res) \
+                                | ridge[j, i]
+
+                todo = np.flatnonzero(near)
+            else:
+                todo = np.flatnonzero(np.isnan(distances))
+
+        if len(todo):
+            distances[todo], gradients[todo] = self._exact_distance(
+                tree, x[todo], y[todo])
+
+        if single:
+            return distances[0], gradients[0]
+
+        return distances, gradients
+
+    def _get_distance_field(self):
+        '''
+        Returns the k-d tree over the edges of the boundary and the signed
+        distance field ``(tree, origin, resolution, values, ridge)``, where
+        the values are computed on the nodes of a grid covering the shape,
+        with a margin of two cells, and `ridge` marks the cells whose
+        corners have distant closest points on the boundary.
+        '''
+        if self._distance_field is None:
+            xmin, ymin, xmax, ymax = self.bounds
+
+            res = max(xmax - xmin, ymax - ymin) / self.distance_field_cells
+
+            if res <= 0:
+                raise ValueError("Cannot compute distances to an empty "
+                                 "shape.")
+
+            tree = _EdgeTree(_geometry_rings(_unwrap(self)), res)
+
+            num_cols = int(np.ceil((xmax - xmin) / res)) + 5
+            num_rows = int(np.ceil((ymax - ymin) / res)) + 5
+
+            x0, y0 = xmin - 2*res, ymin - 2*res
+
+            xx, yy = np.meshgrid(x0 + np.arange(num_cols)*res,
+                                 y0 + np.arange(num_rows)*res)
+
+            distances, closest = tree.nearest(xx.ravel(), yy.ravel())
+
+            inside = _contains_xy(self._prep().context, xx.ravel(),
+                                  yy.ravel())
+            values = np.where(inside, distances, -distances).reshape(
+                xx.shape)
+
+            # the field is not smooth in the cells where the closest
+            # boundary points of the corners are far apart
+            closest = closest.reshape(num_rows, num_cols, 2)
+            spread  = np.zeros((num_rows - 1, num_cols - 1))
+
+            for a in (0, 1):
+                for b in (0, 1):
+                    shift  = closest[a:num_rows - 1 + a, b:num_cols - 1 + b]
+                    spread = np.maximum(spread, np.linalg.norm(
+                        shift - closest[:-1, :-1], axis=2))
+
+            ridge = spread > 2*res
+
+            self._distance_field = (tree, (x0, y0), res, values, ridge)
+
+        return self._distance_field
+
+    def _exact_distance(self, tree, x, y):
+        '''
+        Exact signed distances from the points (x, y) to the boundary, and
+        their gradients.
+        '''
+        distances, closest = tree.nearest(x, y)
+
+        inside = _contains_xy(self._prep().context, x, y)
+        sign   = np.where(inside, 1., -1.)
+
+        gradients = np.column_stack((x, y)) - closest
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            gradients *= (sign / distances)[:, None]
+
+        gradients[distances == 0] = 0.
+
+        return sign*distances, gradients
+
+    def segments_cross(self, starts, ends):
+        '''
+        Check whether segments cross the boundary of the shape (exterior or
+        holes) or of one of its areas.
+
+        The edges of the shape and of its areas are stored in a uniform grid
+        of :attr:`edge_grid_cells` cells along the largest side of the
+        shape (rebuilt after areas or holes are added), so that each segment
+        is only tested against the edges of the cells it goes through.
+
+        .. versionadded:: 0.7
+
+        Parameters
+        ----------
+        starts : array of shape (N, 2)
+            Start points of the segments (can be a `pint.Quantity`).
+        ends : array of shape (N, 2)
+            End points of the segments.
+
+        Returns
+        -------
+        crossed : 1D boolean array of length N
+            Whether each segment crosses a boundary (a segment starting on a
+            boundary does not cross it at its start).
+        points : array of shape (N, 2)
+            First intersection of each segment with a boundary (NaN if the
+            segment does not cross any).
+        areas : 1D array of N ints
+            Index, in ``tuple(shape.areas)``, of the area located right
+            after the first intersection, -1 if the segment leaves the shape
+            or if it does not cross any boundary.
+        '''
+        starts = _to_magnitude(starts, self._unit).reshape(-1, 2)
+        ends   = _to_magnitude(ends, self._unit).reshape(-1, 2)
+
+        t = self._get_edge_grid().first_crossing(starts, ends)
+
+        crossed = np.isfinite(t)
+        points  = np.full(starts.shape, np.nan)
+        areas   = np.full(len(starts), -1, dtype=int)
+
+        if np.any(crossed):
+            vec = ends[crossed] - starts[crossed]
+
+            points[crossed] = starts[crossed] + t[crossed, None]*vec
+            areas[crossed]  = self._area_beside(points[crossed], vec)
+
+        return crossed, points, areas
+
+    def raycast(self, origins, directions, max_dist):
+        '''
+        Cast rays and find their first hit with the boundary of the shape
+        (exterior or holes) or of one of its areas.
+
+        Rays are tested against the same edge grid as in
+        :func:`segments_cross`, as segments of length `max_dist`.
+
+        .. versionadded:: 0.7
+
+        Parameters
+        ----------
+        origins : array of shape (N, 2)
+            Origins of the rays (can be a `pint.Quantity`).
+        directions : array of shape (N, 2)
+            Directions of the rays (they do not need to be normalized).
+        max_dist : float or array of N floats
+            Maximum distance travelled by the rays (can be a
+            `pint.Quantity`), possibly infinite.
+
+        Returns
+        -------
+        hit : 1D boolean array of length N
+            Whether each ray hits a boundary before `max_dist` (a ray
+            starting on a boundary does not hit it at its origin).
+        points : array of shape (N, 2)
+            Hit points (NaN if there is no hit).
+        distances : 1D array of N floats
+            Distances from the origins to the hit points (NaN if there is
+            no hit).
+        normals : array of shape (N, 2)
+            Unit normals of the boundary at the hit points, oriented toward
+            the origins of the rays (NaN if there is no hit).
+        areas : 1D array of N ints
+            Index, in ``tuple(shape.areas)``, of the area located behind the
+            boundary, -1 if the boundary is a wall (the ray leaves the shape)
+            or if there is no hit.
+        height_steps : 1D array of N floats
+            Height of the area behind the boundary minus the height of the
+            area on the side of the ray (NaN for walls or if there is no
+            hit).
+        '''
+        origins    = _to_magnitude(origins, self._unit).reshape(-1, 2)
+        directions = np.asarray(directions, dtype=float).reshape(-1, 2)
+
+        if _unit_support:
+            from .units import Q_
+            if isinstance(max_dist, Q_):
+                max_dist = max_dist.m_as(self._unit)
+
+        max_dist = np.broadcast_to(
+            np.asarray(max_dist, dtype=float), (len(origins),))
+
+        norm = np.linalg.norm(directions, axis=1)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            directions = directions / norm[:, None]
+
+        directions[norm == 0] = 0.
+
+        grid = self._get_edge_grid()
+
+        # rays cannot hit anything beyond the farthest corner of the grid,
+        # which also makes infinite distances usable
+        xmin, ymin, xmax, ymax = grid.bounds
+
+        corners = np.array([(xmin, ymin), (xmax, ymin), (xmax, ymax),
+                            (xmin, ymax)])
+        reach   = np.max(np.linalg.norm(
+            origins[:, None] - corners[None], axis=2), axis=1)
+        length  = np.minimum(max_dist, reach)
+
+        vec = directions*length[:, None]
+
+        t, edges = grid.first_crossing(origins, origins + vec,
+                                       return_edges=True)
+
+        hit = np.isfinite(t)
+        num = len(origins)
+
+        points    = np.full((num, 2), np.nan)
+        distances = np.full(num, np.nan)
+        normals   = np.full((num, 2), np.nan)
+        areas     = np.full(num, -1, dtype=int)
+        steps     = np.full(num, np.nan)
+
+        if np.any(hit):
+            points[hit]    = origins[hit] + t[hit, None]*vec[hit]
+            distances[hit] = t[hit]*length[hit]
+
+            # normals to the edges, facing the rays
+            edge = grid.ends[edges[hit]] - grid.starts[edges[hit]]
+            nrml = np.column_stack((-edge[:, 1], edge[:, 0]))
+            nrml /= np.linalg.norm(nrml, axis=1)[:, None]
+
+            facing = np.sum(nrml*directions[hit], axis=1) > 0
+            nrml[facing] *= -1
+
+            normals[hit] = nrml
+
+            # areas on both sides of the boundary
+            behind = self._area_beside(points[hit], directions[hit])
+            before = self._area_beside(points[hit], -directions[hit])
+
+            heights = np.array([a.height for a in self._areas.values()])
+
+            step = np.full(len(behind), np.nan)
+            wall = (behind < 0) | (before < 0)
+
+            step[~wall] = heights[behind[~wall]] - heights[before[~wall]]
+
+            areas[hit] = behind
+            steps[hit] = step
+
+        return hit, points, distances, normals, areas, steps
+
+    def _area_beside(self, points, directions):
+        '''
+        Returns the index of the areas located right after `points` when
+        moving along `directions` (-1 outside the shape).
+        '''
+        step = 1e-6*self._get_edge_grid().cell_size
+        norm = np.linalg.norm(directions, axis=1)[:, None]
+
+        return self.which_area(points + step*directions/norm)[0]
+
+    def _get_edge_grid(self):
+        '''
+        Returns the grid of the edges of the shape and its areas, with a
+        margin of one cell around the shape.
+        '''
+        if self._edge_grid is None:
+            xmin, ymin, xmax, ymax = self.bounds
+
+            res = max(xmax - xmin, ymax - ymin) / self.edge_grid_cells
+
+            if res <= 0:
+                raise ValueError("Cannot compute crossings with an empty "
+                                 "shape.")
+
+            rings = _geometry_rings(_unwrap(self))
+
+            for area in self._areas.values():
+                rings.extend(_geometry_rings(_unwrap(area)))
+
+            num_cols = int(np.ceil((xmax - xmin) / res)) + 2
+            num_rows = int(np.ceil((ymax - ymin) / res)) + 2
+
+            self._edge_grid = _EdgeGrid(
+                rings, (xmin - res, ymin - res), res, (num_rows, num_cols))
+
+        return self._edge_grid
+
+    def _locate(self, x, y):
+        '''
+        Exact lookup of the index of the area containing each point (x, y),
+        in the order of the Shape's areas, -1 outside the shape.
+        '''
+        rank    = {name: i for i, name in enumerate(self._areas)}
+        indices = np.full(len(x), -1, dtype=int)
+
+        # points inside the shape
+        todo = np.flatnonzero(_contains_xy(self._prep().context, x, y))
+
+        # non-default areas
+        found = self._area_grid().query_points(x[todo], y[todo])
+
+        for name, ids in found.items():
+            ids = todo[ids]
+            ids = ids[indices[ids] < 0]
+
+            if len(ids):
+                geometry = self._areas[name]._prep().context
+                inside   = _contains_xy(geometry, x[ids], y[ids])
+                indices[ids[inside]] = rank[name]
+
+        # the remaining points are in the default areas
+        todo     = todo[indices[todo] < 0]
+        defaults = [name for name in rank if name.find("default_area") == 0]
+
+        for name in defaults[:-1]:
+            geometry = self._areas[name]._prep().context
+            inside   = _contains_xy(geometry, x[todo], y[todo])
+
+            indices[todo[inside]] = rank[name]
+
+            todo = todo[~inside]
+
+        if defaults:
+            indices[todo] = rank[defaults[-1]]
+
+        return indices
 
 
 class Area(Shape):
@@ -1026,9 +2674,10 @@ class Area(Shape):
 
         obj    = None
         g_type = None
+        shape  = _unwrap(shape)
         if isinstance(shape, MultiPolygon):
             g_type = "MultiPolygon"
-        elif isinstance(shape, (Polygon, Shape, Area)):
+        elif isinstance(shape, Polygon):
             g_type = "Polygon"
         else:
             raise TypeError("Expected a Polygon or MultiPolygon object.")
@@ -1039,18 +2688,13 @@ class Area(Shape):
             leftmost   = np.min(ext[:, 0])
             rightmost  = np.max(ext[:, 0])
             scaling    = (max_x - min_x) / (rightmost - leftmost)
-            obj        = scale(shape, scaling, scaling)
+            obj        = _wrap(Area, scale(shape, scaling, scaling))
         else:
-            if g_type == "Polygon":
-                obj    = Polygon(shape)
-            else:
-                obj    = MultiPolygon(shape)
+            obj        = _wrap(Area, shape)
 
-        obj.__class__        = cls
         obj._parent          = None
         obj._unit            = unit
         obj._geom_type       = g_type
-        obj.__class__        = Area
         obj._area            = None
         obj.height           = height
         obj.name             = name
@@ -1115,6 +2759,14 @@ class Area(Shape):
         raise NotImplementedError("Areas cannot be modified.")
 
 
+def _area_column(values):
+    '''
+    Returns the values associated to each area as a float array, followed by
+    NaN for the points outside the shape (area index -1).
+    '''
+    return np.append(np.asarray(values, dtype=float), np.nan)
+
+
 class _PDict(dict):
     """
     Modified dictionary storing the modulation of the properties of an
@@ -26,10 +26,10 @@ import numpy as np
 
 from shapely.affinity import affine_transform
 from shapely.geometry import MultiPolygon
-from shapely.ops import cascaded_union
+from shapely.ops import unary_union
 
 from .shape import Shape
-from .tools import pop_largest
+from .tools import pop_largest, _unwrap
 
 try:
     from .units import _unit_support
@@ -250,8 +250,9 @@ def culture_from_file(filename, min_x=None, max_x=None, unit='um',
     invalid_shapes = []
 
     internal_shapes = []
+    prepared        = main_container._prep()
     for i, s in enumerate(shapes):
-        valid = main_container.contains(s)
+        valid = prepared.contains(_unwrap(s))
         if valid:
             internal_shapes.append(s)
         else:
@@ -262,8 +263,8 @@ def culture_from_file(filename, min_x=None, max_x=None, unit='um',
             internal_shapes.append(s.intersection(main_container))
         assert valid, "Some polygons are not contained in the main container."
 
-    internal_shapes = \
-        cascaded_union(internal_shapes) if internal_shapes else Shape([])
+    internal_shapes = unary_union([_unwrap(s) for s in internal_shapes]) \
+                      if internal_shapes else Shape([])
 
     if internal_shapes_as == "holes":
         diff           = main_container.difference(internal_shapes)
@@ -282,9 +283,10 @@ def culture_from_file(filename, min_x=None, max_x=None, unit='um',
 
     if internal_shapes_as == "areas" and not internal_shapes.is_empty:
         if isinstance(internal_shapes, MultiPolygon):
-            for i, p in enumerate(internal_shapes):
-                culture.add_area(p, name="area_{}".format(i),
-                                 properties=other_properties)
+            culture.add_areas([
+                (p, "area_{}".format(i), None, other_properties)
+                for i, p in enumerate(internal_shapes.geoms)
+            ])
         else:
             culture.add_area(internal_shapes, name="area_1",
                              properties=other_properties)
@@ -0,0 +1,41 @@
+#-*- coding:utf-8 -*-
+#
+# This file is part of the PyNCulture project, which aims at providing tools to
+# easily generate complex neuronal cultures.
+# Copyright (C) 2017 SENeC Initiative
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Make the package importable from a source checkout, where the repository
+root is the package directory itself.
+"""
+
+import importlib.util
+import os
+import sys
+
+
+try:
+    import PyNCulture
+except ImportError:
+    _root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    _spec = importlib.util.spec_from_file_location(
+        "PyNCulture", os.path.join(_root, "__init__.py"),
+        submodule_search_locations=[_root])
+
+    PyNCulture = importlib.util.module_from_spec(_spec)
+    sys.modules["PyNCulture"] = PyNCulture
+    _spec.loader.exec_module(PyNCulture)
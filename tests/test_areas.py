@@ -0,0 +1,280 @@
+#-*- coding:utf-8 -*-
+#
+# test_areas.py
+#
+# This file is part of the PyNCulture project, which aims at providing tools to
+# easily generate complex neuronal cultures.
+# Copyright (C) 2017 SENeC Initiative
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests for the creation and modification of areas and holes """
+
+import numpy as np
+import pytest
+
+from shapely.geometry import Point, box
+from shapely.ops import unary_union
+
+import PyNCulture as nc
+from PyNCulture.tools import _contains_xy, _unwrap
+
+
+def _culture():
+    shape = nc.Shape.rectangle(200, 200)
+    shape.add_area(nc.Shape.rectangle(50, 50, centroid=(50, 50)),
+                   height=5., name="top", properties={"speed": 2.})
+    shape.add_area(nc.Shape.disk(20, centroid=(-50, -50)), height=-3.,
+                   name="well")
+
+    return shape
+
+
+def test_area_views():
+    shape = _culture()
+    areas = shape.areas
+
+    # no copies, and no modification through the views
+    assert areas["top"] is shape.areas["top"]
+    assert shape.default_areas["default_area"] is areas["default_area"]
+
+    with pytest.raises(TypeError):
+        areas["other"] = areas["top"]
+
+    assert set(shape.default_areas) == {"default_area"}
+    assert set(shape.non_default_areas) == {"top", "well"}
+
+    # explicit copies are equal but independent
+    copies = shape.copy_areas()
+
+    assert set(copies) == set(areas)
+
+    for name, area in copies.items():
+        assert area is not areas[name]
+        assert _unwrap(area).equals(_unwrap(areas[name]))
+        assert area.height == areas[name].height
+        assert area.properties == areas[name].properties
+
+    copies["top"].height = 0.
+
+    assert shape.areas["top"].height == 5.
+    assert set(shape.copy_areas("well")) == {"well"}
+
+
+def _lattice_areas(num=6, size=20., step=30.):
+    shape = nc.Shape.rectangle(200, 200)
+
+    for i in range(num):
+        for j in range(num):
+            x, y = -90 + 10 + i*step, -90 + 10 + j*step
+            shape.add_area(box(x, y, x + size, y + size), height=1.,
+                           name="a{}_{}".format(i, j))
+
+    return shape
+
+
+def test_add_area_overlaps():
+    shape = _lattice_areas()
+    rng   = np.random.default_rng(0)
+
+    for _ in range(30):
+        x, y = rng.uniform(-100, 90, 2)
+        w, h = rng.uniform(2, 15, 2)
+        cand = box(x, y, x + w, y + h)
+
+        inter = _unwrap(shape).intersection(cand)
+
+        # sequential check against all areas
+        overlap = any(_unwrap(a).overlaps(inter)
+                      for k, a in shape.non_default_areas.items())
+
+        # the index returns a superset of the overlapping areas
+        near = set(shape._areas_near(inter.bounds))
+
+        assert all(k in near for k, a in shape.non_default_areas.items()
+                   if _unwrap(a).intersects(inter))
+
+        test = _lattice_areas()
+
+        if overlap:
+            with pytest.raises(AssertionError):
+                test.add_area(cand, height=2.)
+        else:
+            test.add_area(cand, height=2., name="new")
+            assert np.isclose(test.areas["new"].area, inter.area)
+
+
+def test_add_area_override():
+    shape = _lattice_areas()
+    cand  = box(-75, -75, 5, -35)
+
+    before = {k: _unwrap(a) for k, a in shape.areas.items()}
+
+    shape.add_area(cand, height=2., name="new", override=True)
+
+    # same result as the difference with every existing area
+    for key, geom in before.items():
+        remaining = geom.difference(cand)
+
+        if remaining.area > 0:
+            assert np.isclose(
+                sum(a.area for k, a in shape.areas.items()
+                    if k == key or k.startswith(key + "_")),
+                remaining.area)
+        else:
+            assert key not in shape.areas
+
+    assert np.isclose(sum(a.area for a in shape.areas.values()), 40000)
+
+
+def test_random_obstacles_lattice():
+    from shapely.affinity import translate
+
+    form = nc.Shape.rectangle(10, 10)
+
+    # obstacles with different heights are inserted as separate areas
+    shape   = nc.Shape.rectangle(200, 200)
+    heights = list(np.linspace(1, 2, 30))
+
+    shape.random_obstacles(30, form, heights=heights, etching=2, rng=0)
+
+    obstacles = [a for k, a in shape.areas.items()
+                 if k.startswith("obstacle_")]
+
+    assert len(obstacles) == 30
+    assert sorted(a.height for a in obstacles) == sorted(heights)
+
+    # each obstacle is a copy of the etched form centered on a node of the
+    # lattice (spaced by the width of the form), clipped by the shape
+    etched = _unwrap(form).buffer(-2, cap_style=3).buffer(2)
+    bounds = box(-100, -100, 100, 100)
+
+    union = None
+
+    for area in obstacles:
+        x, y = 10*np.rint(np.array(area.centroid.coords[0]) / 10)
+        copy = translate(etched, x, y).intersection(bounds)
+
+        assert copy.symmetric_difference(_unwrap(area)).area < 1e-6
+
+        # sequential union
+        union = copy if union is None else union.union(copy)
+
+    # holes: the shape loses the union of the obstacles
+    holes = nc.Shape.rectangle(200, 200)
+    holes.random_obstacles(30, form, etching=2, rng=0)
+
+    assert np.isclose(holes.area, 40000 - union.area)
+    assert _unwrap(holes).symmetric_difference(
+        bounds.difference(union)).area < 1e-6
+
+
+def test_random_obstacles_rsa():
+    shape = nc.Shape.disk(100)
+
+    def _scales(rng, size):
+        return rng.uniform(0.5, 1.5, size)
+
+    shape.random_obstacles(0.3, "rectangle", {"height": 6, "width": 12},
+                           heights=1., placement="random", scales=_scales,
+                           rotate=True, rng=0)
+
+    parts = [_unwrap(a) for k, a in shape.areas.items()
+             if k.startswith("obstacle")]
+
+    # no overlap, checked pairwise, and the target fraction is reached
+    assert np.isclose(sum(p.area for p in parts), unary_union(parts).area)
+    assert sum(p.area for p in parts) >= 0.3*shape.area
+
+    for i, p in enumerate(parts):
+        assert all(p.intersection(q).area < 1e-9 for q in parts[i + 1:])
+
+    # early stop: only the obstacles that were placed are kept
+    shape = nc.Shape.disk(30)
+    shape.rsa_max_failures = 50
+
+    heights = list(np.linspace(1, 2, 200))
+
+    shape.random_obstacles(200, "disk", {"radius": 5}, heights=heights,
+                           placement="random", rng=0)
+
+    placed = [a for k, a in shape.areas.items() if k.startswith("obstacle_")]
+
+    assert 0 < len(placed) < 200
+    assert sorted(a.height for a in placed) == heights[:len(placed)]
+
+
+def _area_table(shape):
+    return {k: (round(a.area, 6), a.height) for k, a in shape.areas.items()}
+
+
+def test_add_holes():
+    rng   = np.random.default_rng(0)
+    holes = [Point(x, y).buffer(r) for (x, y), r in
+             zip(rng.uniform(-90, 90, (20, 2)), rng.uniform(2, 8, 20))]
+
+    bulk, sequential = _culture(), _culture()
+
+    bulk.add_holes(holes)
+
+    for hole in holes:
+        sequential.add_hole(hole)
+
+    assert _unwrap(bulk).symmetric_difference(
+        _unwrap(sequential)).area < 1e-6
+    assert _area_table(bulk) == _area_table(sequential)
+
+    # the rectangle fast path no longer applies
+    pos = bulk.seed_neurons(2000, rng=0)
+
+    assert not np.any(_contains_xy(unary_union(holes), *pos.T))
+
+
+def test_add_areas():
+    entries = [(box(x, y, x + 15, y + 15), "p{}_{}".format(x, y),
+                float(x + y) / 100, {"speed": 1. + x / 100})
+               for x in range(-90, 80, 30) for y in range(-90, 80, 40)]
+
+    bulk, sequential = _culture(), _culture()
+
+    # overlapping areas are refused in both cases
+    with pytest.raises(AssertionError):
+        bulk.add_areas(entries)
+
+    with pytest.raises(AssertionError):
+        for entry in entries:
+            _culture().add_area(entry[0], name=entry[1], height=entry[2],
+                                properties=entry[3])
+
+    # with override, the new areas replace the existing ones
+    bulk = _culture()
+    bulk.add_areas(entries, override=True)
+
+    for geom, name, height, properties in entries:
+        sequential.add_area(geom, name=name, height=height,
+                            properties=properties, override=True)
+
+    assert _area_table(bulk) == _area_table(sequential)
+
+    for name, area in bulk.areas.items():
+        assert area.properties == sequential.areas[name].properties
+        assert _unwrap(area).symmetric_difference(
+            _unwrap(sequential.areas[name])).area < 1e-6
+
+    # an area enclosing existing ones replaces them
+    bulk.add_areas([(box(-95, -95, 95, 95), "large", 7.)], override=True)
+    sequential.add_area(box(-95, -95, 95, 95), name="large", height=7.,
+                        override=True)
+
+    assert _area_table(bulk) == _area_table(sequential)
@@ -0,0 +1,147 @@
+#-*- coding:utf-8 -*-
+#
+# test_crossings.py
+#
+# This file is part of the PyNCulture project, which aims at providing tools to
+# easily generate complex neuronal cultures.
+# Copyright (C) 2017 SENeC Initiative
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests for the crossings of segments and rays with the boundaries """
+
+import numpy as np
+
+from shapely.geometry import LineString, Point
+from shapely.ops import unary_union
+
+import PyNCulture as nc
+
+
+def _culture():
+    shape = nc.Shape.disk(100)
+    shape.add_hole(nc.Shape.rectangle(20, 30, centroid=(-40, 0)))
+    shape.add_area(nc.Shape.disk(25, centroid=(30, 30)), height=10.,
+                   name="top")
+
+    return shape
+
+
+def _boundaries(shape):
+    rings = [shape.geometry.boundary if hasattr(shape, "geometry")
+             else shape.boundary]
+    rings.extend(a.boundary for a in shape.areas.values())
+
+    return unary_union(rings)
+
+
+def _first_hit(boundary, start, end):
+    ''' Distance from `start` to the first crossing (shapely) '''
+    hits = LineString([start, end]).intersection(boundary)
+
+    if hits.is_empty:
+        return np.inf
+
+    points = getattr(hits, "geoms", [hits])
+    dists  = [Point(start).distance(p) for p in points]
+    dists  = [d for d in dists if d > 1e-9]
+
+    return min(dists) if dists else np.inf
+
+
+def test_segments_cross():
+    shape    = _culture()
+    boundary = _boundaries(shape)
+    rng      = np.random.default_rng(0)
+
+    starts = rng.uniform(-120, 120, (300, 2))
+    ends   = rng.uniform(-120, 120, (300, 2))
+
+    crossed, points, _ = shape.segments_cross(starts, ends)
+
+    for s, e, c, p in zip(starts, ends, crossed, points):
+        dist = _first_hit(boundary, s, e)
+
+        assert c == np.isfinite(dist)
+
+        if c:
+            assert np.isclose(np.linalg.norm(p - s), dist)
+
+
+def test_segments_cross_long():
+    shape    = _culture()
+    boundary = _boundaries(shape)
+    rng      = np.random.default_rng(1)
+
+    # segments extending far away from the shape
+    starts = rng.uniform(-120, 120, (50, 2))
+    angles = rng.uniform(0, 2*np.pi, 50)
+    ends   = starts + 1e7*np.column_stack((np.cos(angles), np.sin(angles)))
+
+    starts[:10] = ends[:10] - 2e7*np.column_stack(
+        (np.cos(angles[:10]), np.sin(angles[:10])))
+
+    crossed, points, _ = shape.segments_cross(starts, ends)
+
+    for s, e, c, p in zip(starts, ends, crossed, points):
+        dist = _first_hit(boundary, s, e)
+
+        assert c == np.isfinite(dist)
+
+        if c:
+            assert np.isclose(np.linalg.norm(p - s), dist)
+
+
+def _check_rays(shape, origins, directions, max_dist):
+    boundary = _boundaries(shape)
+
+    hit, points, distances, normals, _, _ = shape.raycast(
+        origins, directions, max_dist)
+
+    unit  = directions / np.linalg.norm(directions, axis=1)[:, None]
+    reach = np.minimum(max_dist, 1e4)
+
+    for o, u, h, p, d, n in zip(origins, unit, hit, points, distances,
+                                normals):
+        dist = _first_hit(boundary, o, o + reach*u)
+
+        assert h == np.isfinite(dist)
+
+        if h:
+            assert np.isclose(d, dist)
+            assert np.allclose(p, o + d*u)
+            assert np.isclose(np.linalg.norm(n), 1)
+            assert np.dot(n, u) <= 0
+
+
+def test_raycast():
+    shape = _culture()
+    rng   = np.random.default_rng(2)
+
+    origins    = rng.uniform(-120, 120, (200, 2))
+    directions = rng.normal(size=(200, 2))
+
+    _check_rays(shape, origins, directions, 50.)
+
+
+def test_raycast_far():
+    shape = _culture()
+    rng   = np.random.default_rng(3)
+
+    origins    = rng.uniform(-120, 120, (100, 2))
+    directions = rng.normal(size=(100, 2))
+
+    # large and infinite distances, which only cost the extent of the grid
+    _check_rays(shape, origins, directions, 1e5)
+    _check_rays(shape, origins, directions, np.inf)
@@ -0,0 +1,68 @@
+#-*- coding:utf-8 -*-
+#
+# test_geom_utils.py
+#
+# This file is part of the PyNCulture project, which aims at providing tools to
+# easily generate complex neuronal cultures.
+# Copyright (C) 2017 SENeC Initiative
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests for the geometric utilities """
+
+import numpy as np
+
+from shapely.geometry import MultiPolygon, Point, Polygon
+
+from PyNCulture.geom_utils import points_in_rings
+from PyNCulture.tools import _geometry_rings
+
+
+def _contains(geometry, x, y):
+    return np.array([geometry.contains(Point(px, py))
+                     for px, py in zip(x, y)], dtype=bool)
+
+
+def _polygons():
+    shell = [(0, 0), (8, 0), (8, 4), (12, 6), (8, 8), (0, 8)]
+    hole  = [(2, 2), (4, 2), (4, 4), (2, 4)]
+
+    return MultiPolygon([Polygon(shell, [hole]),
+                         Polygon([(20, 0), (24, 0), (22, 4)])])
+
+
+def test_points_in_rings():
+    geometry = _polygons()
+    rings    = _geometry_rings(geometry)
+    rng      = np.random.default_rng(0)
+
+    x, y = rng.uniform(-2, 26, (2, 2000))
+
+    assert np.array_equal(points_in_rings(x, y, rings, max_block=1000),
+                          _contains(geometry, x, y))
+
+
+def test_points_in_rings_boundary():
+    geometry = _polygons()
+    rings    = _geometry_rings(geometry)
+
+    # vertices, points on horizontal, vertical and diagonal edges
+    x = [0, 8, 12, 4, 3, 0, 8, 4, 10, 21, 23, 22, 3,  7, 1]
+    y = [0, 4, 6,  0, 2, 5, 2, 3, 5,  2,  2,  0, 3,  7, 1]
+
+    inside = points_in_rings(x, y, rings)
+
+    assert np.array_equal(inside, _contains(geometry, x, y))
+    assert not np.any(inside[:-3])
+    assert np.all(inside[-3:] == [False, True, True])
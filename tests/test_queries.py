@@ -0,0 +1,234 @@
+#-*- coding:utf-8 -*-
+#
+# test_queries.py
+#
+# This file is part of the PyNCulture project, which aims at providing tools to
+# easily generate complex neuronal cultures.
+# Copyright (C) 2017 SENeC Initiative
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests for the point queries on shapes and areas """
+
+import numpy as np
+import pytest
+
+from shapely.geometry import Point, box
+
+import PyNCulture as nc
+from PyNCulture.tools import _unwrap
+
+
+def _culture():
+    shape = nc.Shape.rectangle(100, 200)
+    shape.add_hole(nc.Shape.disk(20, centroid=(-60, 0)))
+    shape.add_area(nc.Shape.rectangle(40, 40, centroid=(20, 20)),
+                   height=5., name="top", properties={"speed": 2.})
+    shape.add_area(nc.Shape.disk(15, centroid=(60, -20)), height=-3.,
+                   name="well")
+
+    return shape
+
+
+def _points(shape, num, seed=0):
+    rng = np.random.default_rng(seed)
+
+    xmin, ymin, xmax, ymax = shape.bounds
+
+    points = np.column_stack((rng.uniform(xmin - 10, xmax + 10, num),
+                              rng.uniform(ymin - 10, ymax + 10, num)))
+
+    # add points on the boundary
+    exterior = np.array(shape.exterior.coords)[:, :2]
+
+    return np.concatenate((points, exterior, 0.5*(exterior[1:]
+                                                  + exterior[:-1])))
+
+
+def test_contains_neurons():
+    shape  = _culture()
+    points = _points(shape, 2000)
+
+    # sequential version
+    expected = [shape.contains(Point(p)) for p in points]
+
+    assert np.array_equal(shape.contains_neurons(points), expected)
+
+    # single and empty positions
+    assert shape.contains_neurons((0., 0.)) is True
+    assert shape.contains_neurons(np.array([-60., 0.])) is False
+    assert shape.contains_neurons(np.zeros((0, 2))).shape == (0,)
+    assert shape.contains_neurons([]).shape == (0,)
+
+
+def test_contains_neurons_units():
+    pytest.importorskip("pint")
+
+    from PyNCulture.units import Q_
+
+    shape  = _culture()
+    points = _points(shape, 500, seed=1)
+
+    contained = shape.contains_neurons(Q_(points*1e-3, "mm"))
+
+    assert np.array_equal(contained, shape.contains_neurons(points))
+
+
+def _sequential_areas(shape, points):
+    ''' Index of the area containing each point, one point at a time. '''
+    names   = tuple(shape.areas)
+    indices = []
+
+    for p in points:
+        found = [i for i, name in enumerate(names)
+                 if shape.areas[name].contains(Point(p))]
+        indices.append(found[0] if found else -1)
+
+    return np.array(indices)
+
+
+def test_which_area():
+    shape  = _culture()
+    points = _points(shape, 1000)
+
+    indices, names = shape.which_area(points)
+
+    assert names == tuple(shape.areas)
+
+    # points on the borders between areas are in none of them with the
+    # sequential test, so only compare the other ones
+    expected = _sequential_areas(shape, points)
+    known    = expected >= 0
+
+    assert np.array_equal(indices[known], expected[known])
+    assert np.all(indices[~shape.contains_neurons(points)] == -1)
+
+    # single positions
+    assert shape.which_area((20., 20.)) == (names.index("top"), names)
+    assert shape.which_area((-60., 0.))[0] == -1
+
+
+def test_label_grid():
+    shape  = _culture()
+    points = _points(shape, 5000, seed=2)
+
+    exact_areas    = shape.which_area(points)[0]
+    exact_contains = shape.contains_neurons(points)
+
+    labels, boundary = shape.build_label_grid(7.)
+
+    # the grid gives the same results as the exact tests
+    assert np.array_equal(shape.which_area(points)[0], exact_areas)
+    assert np.array_equal(shape.contains_neurons(points), exact_contains)
+
+    # all cells crossed by a boundary are marked
+    xmin, ymin, _, _ = shape.bounds
+
+    walls = [_unwrap(shape).boundary]
+    walls.extend(_unwrap(a).boundary for a in shape.areas.values())
+
+    for j, i in zip(*np.nonzero(~boundary)):
+        cell = box(xmin + 7*i, ymin + 7*j, xmin + 7*(i + 1), ymin + 7*(j + 1))
+
+        assert not any(w.intersects(cell) for w in walls)
+
+    # the grid is rebuilt when the geometry changes
+    shape.add_hole(nc.Shape.disk(10, centroid=(20, 20)))
+
+    assert np.array_equal(shape.contains_neurons(points),
+                          [shape.contains(Point(p)) for p in points])
+
+    shape.build_label_grid(None)
+
+    assert shape._get_label_grid() is None
+
+
+def _signed_distance(geometry, points):
+    ''' Sequential signed distance to the boundary of `geometry`. '''
+    geometry = _unwrap(geometry)
+    boundary = geometry.boundary
+
+    return np.array([
+        boundary.distance(Point(p))*(1 if geometry.contains(Point(p)) else -1)
+        for p in points])
+
+
+def test_distance_to_boundary():
+    pytest.importorskip("scipy")
+
+    shape  = _culture()
+    # random points only, since gradients vanish on the boundary
+    points = _points(shape, 1000, seed=3)[:1000]
+
+    expected = _signed_distance(shape, points)
+
+    dist, grad = shape.distance_to_boundary(points, exact=True)
+
+    assert np.allclose(dist, expected)
+
+    # interpolated distances are accurate to a fraction of a cell
+    xmin, ymin, xmax, ymax = shape.bounds
+
+    cell = max(xmax - xmin, ymax - ymin) / shape.distance_field_cells
+
+    dist, grad = shape.distance_to_boundary(points)
+
+    assert np.allclose(dist, expected, atol=0.5*cell)
+
+    # gradients are unit vectors along which the distance increases
+    moved = points + 0.01*grad
+
+    assert np.allclose(np.linalg.norm(grad, axis=1), 1, atol=0.05)
+    assert np.all(_signed_distance(shape, moved) > expected - 1e-3)
+
+    # areas also use their interfaces with the other areas
+    area = shape.areas["top"]
+
+    assert np.allclose(area.distance_to_boundary(points, exact=True)[0],
+                       _signed_distance(area, points))
+
+
+def test_property_at():
+    shape  = _culture()
+    points = _points(shape, 1000, seed=4)
+
+    # sequential lookup: locate each point, then read the area dict
+    names   = tuple(shape.areas)
+    indices = _sequential_areas(shape, points)
+    known   = indices >= 0
+    outside = ~shape.contains_neurons(points)
+
+    def _expected(getter):
+        return np.array([getter(shape.areas[names[i]]) if i >= 0 else np.nan
+                         for i in indices])
+
+    speed  = shape.property_at(points, "speed")
+    height = shape.height_at(points)
+
+    # missing properties are equal to 1
+    expected_speed  = _expected(lambda a: a.properties.get("speed", 1.))
+    expected_height = _expected(lambda a: a.height)
+
+    assert np.array_equal(speed[known], expected_speed[known])
+    assert np.array_equal(height[known], expected_height[known])
+    assert np.all(np.isnan(speed[outside]))
+    assert np.all(np.isnan(height[outside]))
+
+    assert shape.property_at((20., 20.), "speed") == 2.
+    assert shape.height_at((60., -20.)) == -3.
+
+    # changes to the areas are taken into account
+    shape.areas["top"].height = 8.
+
+    assert shape.height_at((20., 20.)) == 8.
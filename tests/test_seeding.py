@@ -0,0 +1,264 @@
+#-*- coding:utf-8 -*-
+#
+# test_seeding.py
+#
+# This file is part of the PyNCulture project, which aims at providing tools to
+# easily generate complex neuronal cultures.
+# Copyright (C) 2017 SENeC Initiative
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests for the seeding of neurons """
+
+import numpy as np
+import pytest
+
+from shapely.geometry import Point
+
+import PyNCulture as nc
+import PyNCulture.shape as shape_module
+
+
+def _contained(geometry, positions):
+    geometry = getattr(geometry, "geometry", geometry)
+
+    return all(geometry.contains(Point(p)) for p in positions)
+
+
+def test_seed_region_cache(monkeypatch):
+    calls = []
+
+    def _counting(polygon, engine=None):
+        calls.append(polygon)
+        return triangulate_mesh(polygon, engine)
+
+    triangulate_mesh = shape_module.triangulate_mesh
+    monkeypatch.setattr(shape_module, "triangulate_mesh", _counting)
+
+    shape = nc.Shape.disk(100)
+    shape.seed_cache_size = 2
+
+    pos1 = shape.seed_neurons(500, xmin=0, rng=0)
+    pos2 = shape.seed_neurons(500, xmin=0, rng=0)
+
+    # the triangulation is reused, with the same results
+    assert len(calls) == 1
+    assert np.array_equal(pos1, pos2)
+    assert np.all(pos1[:, 0] >= 0) and _contained(shape, pos1)
+
+    # the cache is bounded
+    shape.seed_neurons(10, xmin=10, rng=0)
+    shape.seed_neurons(10, xmin=20, rng=0)
+
+    assert len(calls) == 3
+    assert len(shape._seed_cache) == 2
+
+    # and reset when the geometry changes
+    shape.add_hole(nc.Shape.disk(30, centroid=(50, 0)))
+
+    pos3 = shape.seed_neurons(500, xmin=0, rng=0)
+
+    assert len(calls) == 4
+    assert np.all(pos3[:, 0] >= 0) and _contained(shape, pos3)
+
+
+def test_rng_reproducibility():
+    shape = nc.Shape.disk(100)
+    shape.add_hole(nc.Shape.disk(20))
+
+    pos1 = shape.seed_neurons(300, rng=1)
+
+    assert np.array_equal(pos1, shape.seed_neurons(300, rng=1))
+    assert not np.array_equal(pos1, shape.seed_neurons(300, rng=2))
+
+    # generators are used as given, and the default one is the shape's
+    gen  = np.random.default_rng(3)
+    pos2 = shape.seed_neurons(300, rng=gen)
+
+    shape.set_rng(3)
+
+    assert np.array_equal(pos2, shape.seed_neurons(300))
+
+    # the global state is not used
+    np.random.seed(0)
+    state = np.random.get_state()[1].copy()
+
+    shape.seed_neurons(300, rng=4)
+
+    assert np.array_equal(state, np.random.get_state()[1])
+
+    # obstacles
+    cultures = []
+
+    for _ in range(2):
+        culture = nc.Shape.rectangle(200, 200)
+        culture.random_obstacles(20, "disk", {"radius": 5},
+                                 placement="random", rng=5)
+        cultures.append(culture)
+
+    assert cultures[0].wkb == cultures[1].wkb
+
+
+def test_backup_shape_rng():
+    pytest.importorskip("scipy")
+
+    from PyNCulture.backup_shape import BackupShape
+
+    shape = BackupShape.disk(50)
+    pos   = shape.seed_neurons(200, rng=0)
+
+    assert np.array_equal(pos, shape.seed_neurons(200, rng=0))
+    assert np.all(np.linalg.norm(pos, axis=1) <= 50)
+
+
+def test_spawn():
+    streams1 = [g.random(5) for g in nc.spawn(4, 42)]
+    streams2 = [g.random(5) for g in nc.spawn(4, 42)]
+
+    # same seed, same streams, whatever the order in which they are used
+    assert np.array_equal(streams1, streams2)
+    assert np.array_equal([g.random(5) for g in nc.spawn(4, 42)[::-1]],
+                          streams1[::-1])
+
+    # independent streams
+    assert len({tuple(s) for s in streams1}) == 4
+
+    # spawning from a generator gives new streams at each call
+    gen = np.random.default_rng(0)
+
+    first  = nc.spawn(2, gen)[0].random(5)
+    second = nc.spawn(2, gen)[0].random(5)
+
+    assert not np.array_equal(first, second)
+
+
+def test_parallel_seeding():
+    from PyNCulture.triangulate import parallel_sample
+
+    shape = nc.Shape.disk(100)
+    shape.add_hole(nc.Shape.rectangle(20, 120))
+
+    sampler = shape._seed_sampler(None, None, None, None, None, None, 0)
+
+    # sequential version: one stream per chunk
+    chunks   = [sampler.sample(size, rng=gen)
+                for size, gen in zip((100, 100, 50), nc.spawn(3, 7))]
+    expected = np.concatenate(chunks)
+
+    out    = np.empty((250, 2))
+    points = parallel_sample(sampler, 250, rng=7, num_threads=3,
+                             chunk_size=100, out=out)
+
+    assert points is out
+    assert np.array_equal(points, expected)
+
+    # the result does not depend on the number of threads
+    pos1 = shape.seed_neurons(5000, rng=0, num_threads=2)
+    pos2 = shape.seed_neurons(5000, rng=0, num_threads=4)
+
+    assert np.array_equal(pos1, pos2)
+    assert np.all(shape.contains_neurons(pos1))
+    assert len(np.unique(pos1, axis=0)) == 5000
+
+
+def test_iter_seed_neurons(tmp_path):
+    shape = nc.Shape.disk(100)
+    shape.add_hole(nc.Shape.disk(20))
+
+    chunks = list(shape.iter_seed_neurons(2500, chunk_size=1000, xmin=-50,
+                                          rng=0))
+
+    assert [len(c) for c in chunks] == [1000, 1000, 500]
+
+    # same as drawing the chunks one after the other from the sampler
+    sampler = shape._seed_sampler(None, None, -50, None, None, None, 0)
+    gen     = np.random.default_rng(0)
+
+    for chunk, size in zip(chunks, (1000, 1000, 500)):
+        assert np.array_equal(chunk, sampler.sample(size, rng=gen))
+
+    positions = np.concatenate(chunks)
+
+    assert np.all(positions[:, 0] >= -50)
+    assert np.all(shape.contains_neurons(positions))
+
+    # direct output to a .npy file
+    fname = str(tmp_path / "positions.npy")
+
+    for _ in shape.iter_seed_neurons(2500, chunk_size=1000, xmin=-50,
+                                     rng=0, out=fname):
+        pass
+
+    assert np.array_equal(np.load(fname), positions)
+
+
+def test_min_distance_seeding():
+    pytest.importorskip("scipy")
+
+    from scipy.spatial.distance import pdist
+
+    shape = nc.Shape.rectangle(200, 200)
+    shape.add_hole(nc.Shape.disk(40))
+    shape.add_area(nc.Shape.rectangle(50, 50, centroid=(60, 60)),
+                   height=1., name="top")
+
+    pos = shape.seed_neurons(800, min_distance=5., rng=0)
+
+    assert len(pos) == 800
+    assert pdist(pos).min() >= 5.
+    assert np.all(shape.contains_neurons(pos))
+
+    # inside an area
+    pos = shape.seed_neurons(50, min_distance=5., on_area="top", rng=0)
+
+    assert pdist(pos).min() >= 5.
+    assert np.all(shape.areas["top"].contains_neurons(pos))
+
+    # a disk of radius 5 cannot contain more than 7 points separated by 5
+    with pytest.raises(RuntimeError):
+        nc.Shape.disk(5).seed_neurons(20, min_distance=5., rng=0)
+
+
+def test_per_area_seeding():
+    shape = nc.Shape.rectangle(200, 200)
+    shape.add_area(nc.Shape.rectangle(50, 50, centroid=(60, 60)),
+                   height=1., name="top", properties={"density": 0.02})
+    shape.add_area(nc.Shape.disk(30, centroid=(-50, -50)), height=2.,
+                   name="well")
+
+    counts = {"default_area": 300, "top": 100, "well": 0}
+
+    pos, areas = shape.seed_neurons(counts, rng=0)
+
+    assert len(pos) == 400
+
+    # same as one seeding per area
+    for name, num in counts.items():
+        in_area = pos[areas == name]
+
+        assert len(in_area) == num
+        assert all(shape.areas[name].contains(Point(p)) for p in in_area)
+
+    # densities, given per area or read from a property
+    pos, areas = shape.seed_neurons(density={"top": 0.02, "well": 0.01},
+                                    rng=0)
+
+    assert np.sum(areas == "top") == 50
+    assert np.sum(areas == "well") == np.rint(
+        0.01*shape.areas["well"].area)
+    assert all(shape.areas[n].contains(Point(p)) for p, n in zip(pos, areas))
+
+    pos, areas = shape.seed_neurons(density="density", rng=0)
+
+    assert set(areas) == {"top"} and len(pos) == 50
@@ -0,0 +1,129 @@
+#-*- coding:utf-8 -*-
+#
+# test_shape.py
+#
+# This file is part of the PyNCulture project, which aims at providing tools to
+# easily generate complex neuronal cultures.
+# Copyright (C) 2017 SENeC Initiative
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests for the Shape objects and their cached data """
+
+import numpy as np
+import pytest
+
+from shapely.geometry import Point, Polygon, box
+
+import PyNCulture as nc
+from PyNCulture.tools import _unwrap
+
+
+def test_shape_backend():
+    shell = [(0, 0), (40, 0), (40, 20), (0, 20)]
+    hole  = [(5, 5), (10, 5), (10, 10), (5, 10)]
+
+    polygon = Polygon(shell, [hole])
+    shape   = nc.Shape.from_polygon(polygon)
+
+    # the shape behaves as the polygon it is built from
+    assert isinstance(shape.geometry, Polygon)
+    assert shape.geometry.equals(polygon)
+    assert shape.area == polygon.area
+    assert shape.bounds == polygon.bounds
+    assert shape.contains(Point(20, 15)) and not shape.contains(Point(7, 7))
+    assert len(shape.interiors) == 1
+
+    # shapes are accepted as arguments and compare as their geometry
+    other = nc.Shape.from_polygon(box(30, 10, 60, 30))
+
+    assert shape.intersects(other) and other.intersects(shape)
+    assert np.isclose(shape.intersection(other).area, 100)
+    assert shape == nc.Shape.from_polygon(polygon)
+    assert shape != other
+
+    # areas wrap their geometry as well
+    shape.add_area(box(20, 0, 30, 20), height=2., name="band")
+
+    band = shape.areas["band"]
+
+    assert isinstance(band, nc.Area)
+    assert np.isclose(band.area, 200)
+    assert shape.contains(band) and band.within(shape)
+    assert _unwrap(band).equals(box(20, 0, 30, 20))
+
+
+def test_prepared_geometry():
+    shape  = nc.Shape.rectangle(100, 100)
+    points = np.random.default_rng(0).uniform(-60, 60, (500, 2))
+
+    prepared = shape._prep()
+
+    assert shape._prep() is prepared
+    assert np.array_equal(shape.contains_neurons(points),
+                          [prepared.contains(Point(p)) for p in points])
+
+    # the prepared geometry follows the changes of the shape and its areas
+    shape.add_hole(box(-20, -20, 20, 20))
+
+    assert shape._prep() is not prepared
+    assert np.array_equal(shape.contains_neurons(points),
+                          [shape.contains(Point(p)) for p in points])
+
+    shape.add_area(box(20, 20, 50, 50), height=1., name="corner")
+
+    area = shape.areas["corner"]
+
+    assert area._prep().contains(Point(30, 30))
+    assert not shape.areas["default_area"]._prep().contains(Point(30, 30))
+
+    # predicates on the areas use the updated geometries
+    with pytest.raises(AssertionError):
+        shape.add_area(box(40, 10, 45, 30), height=2.)
+
+
+def _check_properties(shape):
+    geometry = _unwrap(shape)
+
+    assert shape.bounds == geometry.bounds
+    assert shape.area == geometry.area
+    assert shape.length == geometry.length
+    assert shape.centroid.equals(geometry.centroid)
+    assert np.array_equal(shape.exterior_coords,
+                          np.array(geometry.exterior.coords)[:, :2])
+
+
+def test_cached_properties():
+    shape = nc.Shape.disk(50)
+
+    _check_properties(shape)
+
+    # values are computed only once
+    assert shape.centroid is shape.centroid
+    assert shape.exterior_coords is shape.exterior_coords
+    assert not shape.exterior_coords.flags.writeable
+
+    # and updated with the geometry
+    shape.add_hole(nc.Shape.disk(10, centroid=(20, 0)))
+
+    _check_properties(shape)
+
+    shape.add_holes([box(-60, -60, 0, 60)])
+
+    _check_properties(shape)
+
+    assert shape.bounds[0] == 0.
+
+    for area in shape.areas.values():
+        _check_properties(area)
@@ -0,0 +1,256 @@
+#-*- coding:utf-8 -*-
+#
+# test_triangulate.py
+#
+# This file is part of the PyNCulture project, which aims at providing tools to
+# easily generate complex neuronal cultures.
+# Copyright (C) 2017 SENeC Initiative
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests for the triangulation and the samplers """
+
+import numpy as np
+import pytest
+
+from shapely.affinity import rotate
+from shapely.geometry import Point, Polygon, box
+from shapely.ops import unary_union
+
+from PyNCulture.triangulate import (TriangleSampler, rnd_pts_in_tr,
+                                    triangulate_mesh)
+
+
+def _check_earcut(polygon):
+    ''' The triangles must tile `polygon` exactly. '''
+    vertices, faces = triangulate_mesh(polygon, engine="earcut")
+    sampler = TriangleSampler(vertices[faces])
+
+    assert np.isclose(sampler.area, polygon.area, rtol=1e-9)
+
+    # the triangles do not overlap, so each one lies inside the polygon
+    for centroid in vertices[faces].mean(axis=1):
+        assert polygon.contains(Point(centroid))
+
+
+def _checkerboard(num_holes, size=5.):
+    ''' Square with square holes touching each other at their corners. '''
+    holes = []
+
+    # diagonal chains of holes, which keeps the interior connected
+    for j in range(1, 19):
+        for i in range(1, 19):
+            if (i - j) % 4 == 0 and len(holes) < num_holes:
+                x, y = i*size, j*size
+                holes.append([(x, y), (x + size, y), (x + size, y + size),
+                              (x, y + size)])
+
+    return Polygon([(0, 0), (100, 0), (100, 100), (0, 100)], holes)
+
+
+def test_earcut_simple():
+    _check_earcut(Point(0, 0).buffer(10))
+    _check_earcut(box(0, 0, 10, 10).difference(Point(5, 5).buffer(2)))
+
+
+def test_earcut_touching_holes():
+    polygon = _checkerboard(80)
+
+    assert polygon.is_valid
+    assert np.isclose(polygon.area, 8000)
+
+    _check_earcut(polygon)
+    _check_earcut(rotate(polygon, 17, origin=(0, 0)))
+
+
+def test_earcut_hole_touching_shell():
+    # diamond holes touching the shell and each other at a vertex
+    shell = [(0, 0), (20, 0), (20, 10), (0, 10)]
+    holes = [[(5, 0), (8, 3), (5, 6), (2, 3)],
+             [(11, 0.5), (14, 3), (11, 5.5), (8, 3)],
+             [(17, 3), (20, 6), (17, 9), (14, 6)]]
+
+    polygon = Polygon(shell, holes)
+
+    assert polygon.is_valid
+
+    _check_earcut(polygon)
+
+
+def test_earcut_merged_squares():
+    # shapely nodes the rings of unions where squares touch at a corner
+    rng = np.random.default_rng(0)
+
+    for _ in range(5):
+        cells  = rng.integers(0, 12, size=(60, 2))
+        region = unary_union([box(i, j, i + 1, j + 1) for i, j in cells])
+
+        for polygon in getattr(region, "geoms", [region]):
+            _check_earcut(polygon)
+            _check_earcut(rotate(polygon, 33, origin=(0, 0)))
+
+
+def test_seed_region_area(monkeypatch):
+    import PyNCulture as nc
+    import PyNCulture.shape as shape_module
+
+    from PyNCulture.triangulate import RejectionSampler
+
+    shape = nc.Shape.rectangle(100, 100, centroid=(50, 50))
+    shape.add_holes([Polygon(h) for h in _checkerboard(80).interiors])
+
+    seed_area, sampler = shape._seed_region(None, None, shape.bounds, 0.)
+
+    assert isinstance(sampler, TriangleSampler)
+    assert np.isclose(sampler.area, seed_area.area)
+    assert np.isclose(sampler.area, 8000)
+
+    # a triangulation which does not match the area is not used
+    def _wrong_mesh(polygon, engine=None):
+        xmin, ymin, xmax, ymax = polygon.bounds
+        vertices = np.array([(xmin, ymin), (xmax, ymin), (xmax, ymax),
+                             (xmin, ymax)])
+        return vertices, np.array([(0, 1, 2), (0, 2, 3)])
+
+    monkeypatch.setattr(shape_module, "triangulate_mesh", _wrong_mesh)
+
+    shape = nc.Shape.rectangle(100, 100, centroid=(50, 50))
+    shape.add_holes([Polygon(h) for h in _checkerboard(80).interiors])
+
+    seed_area, sampler = shape._seed_region(None, None, shape.bounds, 0.)
+
+    assert isinstance(sampler, RejectionSampler)
+
+    pos = shape.seed_neurons(1000, rng=0)
+
+    assert np.all(shape.contains_neurons(pos))
+
+
+def _triangles(num_cols, seed=0):
+    ''' Tiling of a square by triangles of different sizes. '''
+    rng = np.random.default_rng(seed)
+    xs  = np.sort(np.concatenate(([0, 10], rng.uniform(0, 10, num_cols))))
+    ys  = np.sort(np.concatenate(([0, 10], rng.uniform(0, 10, num_cols))))
+
+    triangles = []
+
+    for x0, x1 in zip(xs[:-1], xs[1:]):
+        for y0, y1 in zip(ys[:-1], ys[1:]):
+            triangles.append([(x0, y0), (x1, y0), (x1, y1)])
+            triangles.append([(x0, y0), (x1, y1), (x0, y1)])
+
+    return np.array(triangles)
+
+
+def test_alias_table():
+    triangles = _triangles(5)
+    sampler   = TriangleSampler(triangles)
+
+    # probability of each triangle implied by the alias table, compared to
+    # the weights used by np.random.choice in the sequential version
+    num  = len(triangles)
+    prob = sampler._prob / num
+    prob = prob + np.bincount(sampler._alias, weights=1 - sampler._prob,
+                              minlength=num) / num
+
+    areas = [Polygon(t).area for t in triangles]
+
+    assert np.allclose(prob, np.divide(areas, np.sum(areas)))
+    assert np.isclose(sampler.area, 100)
+
+
+def test_triangle_sampler():
+    triangles = _triangles(3, seed=1)
+    polygons  = [Polygon(t) for t in triangles]
+
+    # shapely triangles and vertex arrays give the same points
+    points = rnd_pts_in_tr(polygons, 20000, rng=0)
+
+    assert np.array_equal(points, rnd_pts_in_tr(triangles, 20000, rng=0))
+    assert np.array_equal(
+        points, TriangleSampler(triangles).sample(20000, rng=0))
+
+    # the points are uniformly distributed over the triangles
+    a, b, c = (triangles[:, i, None] for i in range(3))
+
+    def _side(u, v):
+        return (v[..., 0] - u[..., 0])*(points[:, 1] - u[..., 1]) - \
+               (v[..., 1] - u[..., 1])*(points[:, 0] - u[..., 0])
+
+    tol    = 1e-12
+    inside = (_side(a, b) >= -tol) & (_side(b, c) >= -tol) \
+             & (_side(c, a) >= -tol)
+    counts = np.count_nonzero(inside, axis=1)
+    expect = np.array([poly.area for poly in polygons]) / 100
+
+    assert counts.sum() >= len(points)
+    assert np.all(np.abs(counts / len(points) - expect)
+                  < 5*np.sqrt(expect / len(points)))
+
+
+def test_rejection_sampler(monkeypatch):
+    import PyNCulture.triangulate as tr
+
+    from PyNCulture.triangulate import RejectionSampler
+
+    # thin and porous region, where most candidates are rejected
+    region = box(0, 0, 100, 100).difference(box(2, 2, 98, 98))
+    region = region.difference(Point(0, 50).buffer(1.5))
+
+    calls = []
+
+    def _counting(geometry, x, y):
+        calls.append(len(x))
+        return contains_xy(geometry, x, y)
+
+    contains_xy = tr._contains_xy
+    monkeypatch.setattr(tr, "_contains_xy", _counting)
+
+    sampler = RejectionSampler(region)
+    points  = sampler.sample(20000, rng=0)
+
+    assert len(points) == 20000
+    assert all(region.contains(Point(p)) for p in points[::10])
+
+    # the batches adapt to the acceptance rate
+    assert len(calls) <= 4
+
+    # uniform distribution: compare with the sequential loop on the
+    # fraction of points in the left band
+    left = np.mean(points[:, 0] < 2)
+
+    assert abs(left - region.intersection(box(0, 0, 2, 100)).area
+               / region.area) < 0.02
+
+
+def test_seed_porous_region():
+    import PyNCulture as nc
+
+    from PyNCulture.triangulate import RejectionSampler
+
+    shape = nc.Shape.rectangle(100, 100)
+    shape.add_holes([Point(x, y).buffer(2) for x in (-25, 0, 25)
+                     for y in (-25, 0, 25)])
+
+    # regions with many vertices but few holes use rejection sampling
+    shape.rejection_vertices = 50
+
+    _, sampler = shape._seed_region(None, None, shape.bounds, 0.)
+
+    assert isinstance(sampler, RejectionSampler)
+
+    pos = shape.seed_neurons(2000, rng=0)
+
+    assert np.all(shape.contains_neurons(pos))
+    assert all(shape.contains(Point(p)) for p in pos)
@@ -20,6 +20,8 @@
 
 """ Tools for PyNCulture """
 
+from collections import OrderedDict
+
 try:
     from collections.abc import Container as _container
 except:
@@ -28,6 +30,7 @@ except:
 import numpy as np
 
 from . import _shapely_support
+from .geom_utils import points_in_rings
 
 
 def indexable(obj):
@@ -39,6 +42,98 @@ def indexable(obj):
     return False
 
 
+class _GeometryProxy(object):
+
+    '''
+    Base class of :class:`~PyNCulture.Shape` and :class:`~PyNCulture.Area`
+    with shapely >= 2, where geometries can no longer be subclassed.
+
+    The shapely geometry is stored in `_geometry`; its attributes and methods
+    are forwarded, replacing Shape or Area arguments by their geometries.
+    Equality and hashing also rely on the geometry, so that equal shapes
+    compare equal, as with shapely < 2.
+
+    .. versionadded:: 0.7
+    '''
+
+    def __init__(self, shell=None, holes=None):
+        from shapely.geometry import Polygon
+        self._geometry = Polygon(shell, holes=holes)
+
+    def __getattr__(self, name):
+        # only called if `name` is not found on the object itself
+        if name == "_geometry" or name.startswith("__"):
+            raise AttributeError(name)
+
+        attr = getattr(self._geometry, name)
+
+        if callable(attr):
+            def method(*args, **kwargs):
+                args   = [_unwrap(a) for a in args]
+                kwargs = {k: _unwrap(v) for k, v in kwargs.items()}
+                return attr(*args, **kwargs)
+
+            method.__doc__ = attr.__doc__
+
+            return method
+
+        return attr
+
+    def __bool__(self):
+        return not self._geometry.is_empty
+
+    def __eq__(self, other):
+        return self._geometry == _unwrap(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._geometry)
+
+    def __repr__(self):
+        return "<{} {}>".format(type(self).__name__, self._geometry.wkt)
+
+    @property
+    def __geo_interface__(self):
+        return self._geometry.__geo_interface__
+
+
+def _unwrap(obj):
+    '''
+    Returns the shapely geometry of a Shape or Area (`obj` itself for other
+    objects, in particular for all objects with shapely < 2).
+    '''
+    if isinstance(obj, _GeometryProxy):
+        return obj._geometry
+    return obj
+
+
+def _wrap(cls, geometry):
+    '''
+    Returns a new instance of `cls` (Shape or Area) based on a copy of
+    `geometry`, without calling ``cls.__init__``.
+    '''
+    geometry = _unwrap(geometry)
+
+    if issubclass(cls, _GeometryProxy):
+        # shapely geometries are immutable, no copy needed
+        obj           = object.__new__(cls)
+        obj._geometry = geometry
+        return obj
+
+    from shapely.geometry import MultiPolygon, Polygon
+
+    if isinstance(geometry, MultiPolygon):
+        obj = MultiPolygon(geometry)
+    else:
+        obj = Polygon(geometry)
+
+    obj.__class__ = cls
+
+    return obj
+
+
 def pop_largest(shapes):
     '''
     Returns the largest shape, removing it from the list.
@@ -60,17 +155,112 @@ def pop_largest(shapes):
     max_area = -np.inf
     max_idx  = -1
 
-    for i, s in enumerate(shapes):
+    multi    = MultiPolygon is not None and isinstance(shapes, MultiPolygon)
+    polygons = shapes.geoms if multi else shapes
+
+    for i, s in enumerate(polygons):
         if s.area > max_area:
             max_area = s.area
             max_idx  = i
 
-    if shapes.__class__ == MultiPolygon:
-        return shapes[max_idx]
+    if multi:
+        return shapes.geoms[max_idx]
 
     return shapes.pop(max_idx)
 
 
+def spawn(n, seed=None):
+    '''
+    Derive `n` independent random number generators from `seed`.
+
+    The generators are obtained from a :class:`numpy.random.SeedSequence`,
+    so the streams given to parallel workers only depend on `seed` and on
+    their index, not on the scheduling of the workers.
+
+    .. versionadded:: 0.7
+
+    Parameters
+    ----------
+    n : int
+        Number of generators.
+    seed : int, :class:`~numpy.random.SeedSequence` or
+           :class:`~numpy.random.Generator`, optional (default: None)
+        Source of entropy. A Generator is spawned from its own seed sequence
+        (consecutive calls therefore return new independent streams).
+        If None, fresh entropy is taken from the operating system.
+
+    Returns
+    -------
+    rngs : list of :class:`numpy.random.Generator`
+    '''
+    if isinstance(seed, np.random.Generator):
+        bitgen   = seed.bit_generator
+        seed_seq = getattr(bitgen, "seed_seq", None)
+        if seed_seq is None:
+            seed_seq = bitgen._seed_seq
+    elif isinstance(seed, np.random.SeedSequence):
+        seed_seq = seed
+    elif isinstance(seed, np.random.RandomState) or seed is np.random:
+        seed_seq = np.random.SeedSequence(
+            seed.randint(0, 2**32, size=4, dtype=np.uint64))
+    else:
+        seed_seq = np.random.SeedSequence(seed)
+
+    return [np.random.default_rng(s) for s in seed_seq.spawn(n)]
+
+
+def _get_rng(rng=None, default=None):
+    '''
+    Returns the random number generator to use: `rng` if provided, otherwise
+    `default`, and the global NumPy state if both are None.
+    Integers and seed sequences are converted to new generators.
+    '''
+    rng = default if rng is None else rng
+
+    if rng is None:
+        return np.random
+
+    if isinstance(rng, (np.random.Generator, np.random.RandomState)) \
+       or rng is np.random:
+        return rng
+
+    return np.random.default_rng(rng)
+
+
+class _LRUCache(object):
+
+    '''
+    Bounded cache discarding the least recently used entries.
+    '''
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self._data   = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        ''' Return the entry associated to `key` and mark it as recent. '''
+        if key in self._data:
+            self._data.move_to_end(key)
+            return self._data[key]
+        return default
+
+    def set(self, key, value):
+        ''' Store `value`, evicting the oldest entries if necessary. '''
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+
 def _insert_area(container, area_name, shape, height, properties):
     '''
     Insert the area into the container, potentially restructuring the existing
@@ -89,30 +279,172 @@ def _insert_area(container, area_name, shape, height, properties):
     # import
     from .shape import Area
     from shapely.geometry import MultiPolygon
+    shape = _unwrap(shape)
     # check for multiple polygons
-    if shape.__class__ == MultiPolygon:
+    if isinstance(shape, MultiPolygon):
         # behavior differs for default_area (never deleted) and other areas
         if area_name == "default_area":
-            largest = pop_largest(shape)
-            count   = len(container.default_areas)
-            for p in shape:
-                new_name = area_name
-                if p != largest:
-                    new_name = area_name + '_' + str(count)
-                    count += 1
-                container._areas[new_name] = Area.from_shape(
-                    p, height=height, name=new_name, properties=properties)
+            # compare by position: polygon equality checks every vertex
+            polygons = list(shape.geoms)
+            largest  = pop_largest(polygons)
+            count    = len(container.default_areas)
+            _set_area(container, area_name, Area.from_shape(
+                largest, height=height, name=area_name,
+                properties=properties))
+            for p in polygons:
+                new_name = area_name + '_' + str(count)
+                count   += 1
+                _set_area(container, new_name, Area.from_shape(
+                    p, height=height, name=new_name, properties=properties))
         else:
-            for i, p in enumerate(shape):
+            for i, p in enumerate(shape.geoms):
                 new_name = area_name + '_' + str(i)
-                container._areas[new_name] = Area.from_shape(
-                    p, height=height, name=new_name, properties=properties)
+                _set_area(container, new_name, Area.from_shape(
+                    p, height=height, name=new_name, properties=properties))
             if area_name in container.areas:
-                del container._areas[area_name]
+                _remove_area(container, area_name)
     else:
-        container._areas[area_name] = Area.from_shape(
-                shape, height=height, name=area_name, properties=properties)
-            
+        _set_area(container, area_name, Area.from_shape(
+                shape, height=height, name=area_name, properties=properties))
+
+
+def _set_area(container, name, area):
+    '''
+    Store `area` in `container` under `name`, updating the spatial index of
+    the non-default areas if it exists.
+    '''
+    container._areas[name] = area
+
+    index = container._area_index
+
+    if index is not None and name.find("default_area") != 0:
+        index.insert(name, area.bounds)
+
+
+def _remove_area(container, name):
+    '''
+    Remove the area `name` from `container` and from its spatial index.
+    '''
+    del container._areas[name]
+
+    if container._area_index is not None:
+        container._area_index.remove(name)
+
+
+def _transformed_copies(geometry, offsets, scales=None, angles=None):
+    '''
+    Returns a list of copies of `geometry` (Polygon or MultiPolygon), each
+    scaled by ``scales[i]`` and rotated by ``angles[i]`` (in radians) around
+    the origin, then translated by ``offsets[i]``.
+    '''
+    geometry = _unwrap(geometry)
+    offsets  = np.asarray(offsets, dtype=float).reshape(-1, 2)
+    num      = len(offsets)
+    scales  = np.ones(num) if scales is None else np.asarray(scales, float)
+    angles  = np.zeros(num) if angles is None else np.asarray(angles, float)
+
+    # per-copy linear transform [[a, -b], [b, a]]
+    lin_a = scales*np.cos(angles)
+    lin_b = scales*np.sin(angles)
+
+    try:
+        # shapely >= 2: transform all the coordinates at once
+        from shapely import get_num_coordinates, transform
+
+        num_coords = get_num_coordinates(geometry)
+        shift      = np.repeat(offsets, num_coords, axis=0)
+        rep_a      = np.repeat(lin_a, num_coords)[:, None]
+        rep_b      = np.repeat(lin_b, num_coords)[:, None]
+        geoms      = np.empty(num, dtype=object)
+        geoms[:]   = [geometry]*num
+
+        def _apply(coords):
+            rotated = coords*rep_a + coords[:, ::-1]*rep_b*[-1, 1]
+            return rotated + shift
+
+        return list(transform(geoms, _apply))
+    except ImportError:
+        from shapely.geometry import MultiPolygon, Polygon
+
+    multi    = hasattr(geometry, "geoms")
+    polygons = geometry.geoms if multi else [geometry]
+    parts    = [(np.asarray(p.exterior.coords)[:, :2],
+                 [np.asarray(h.coords)[:, :2] for h in p.interiors])
+                for p in polygons]
+
+    copies = []
+
+    for offset, a, b in zip(offsets, lin_a, lin_b):
+        matrix = np.array([[a, b], [-b, a]])
+        polys  = [Polygon(ext.dot(matrix) + offset,
+                          [h.dot(matrix) + offset for h in holes])
+                  for ext, holes in parts]
+        copies.append(MultiPolygon(polys) if multi else polys[0])
+
+    return copies
+
+
+def _geometry_rings(geometry):
+    '''
+    Returns the list of the rings (exterior and interiors) of a Polygon or
+    MultiPolygon as arrays of shape (M, 2).
+    '''
+    polygons = geometry.geoms if hasattr(geometry, "geoms") else [geometry]
+    rings    = []
+
+    for p in polygons:
+        if not p.is_empty:
+            rings.append(np.asarray(p.exterior.coords))
+            rings.extend((np.asarray(h.coords) for h in p.interiors))
+
+    return rings
+
+
+def _contains_xy(geometry, x, y):
+    '''
+    Vectorized containment test of the points (x, y) in `geometry`.
+
+    Uses :func:`shapely.contains_xy` if available (shapely >= 2), otherwise
+    an even-odd crossing test over the rings of `geometry`.
+    '''
+    x        = np.asarray(x, dtype=float)
+    y        = np.asarray(y, dtype=float)
+    geometry = _unwrap(geometry)
+
+    try:
+        from shapely import contains_xy
+        return contains_xy(geometry, x, y)
+    except ImportError:
+        return points_in_rings(
+            x, y, _geometry_rings(geometry)).reshape(x.shape)
+
+
+def _to_magnitude(values, unit):
+    '''
+    Returns `values` as a float array in `unit`, converting `pint` quantities
+    in a single operation.
+    '''
+    try:
+        from .units import Q_
+    except ImportError:
+        return np.asarray(values, dtype=float)
+
+    if isinstance(values, Q_):
+        return np.asarray(values.m_as(unit), dtype=float)
+
+    if len(values) and isinstance(values[0], Q_):
+        # sequence of quantities: stack them into a single quantity
+        return np.asarray(np.stack(values).m_as(unit), dtype=float)
+
+    # numpy scalars are indexable but have no length
+    if len(values) and hasattr(values[0], "__len__") and len(values[0]) \
+       and isinstance(values[0][0], Q_):
+        return np.asarray(
+            np.stack([np.stack(row) for row in values]).m_as(unit),
+            dtype=float)
+
+    return np.asarray(values, dtype=float)
+
 
 def _backup_contains(x, y, shape):
     try:
@@ -20,30 +20,736 @@
 
 """ Triangulation and fast random point generation methods """
 
-from OpenGL.GLU import *
-from OpenGL.GL import *
+import logging
 
 from shapely.geometry import Polygon, MultiPolygon
+from shapely.ops import clip_by_rect
 
 import numpy as np
 
+from .pync_log import _log_message
+from .tools import _contains_xy, _get_rng, _unwrap, spawn
 
-def triangulate(polygon):
+_logger = logging.getLogger(__name__)
+
+# maximum number of holes bridged in a single ring by the ear-clipping
+_earcut_max_holes = 32
+
+# opengl support
+
+try:
+    from OpenGL.GLU import *
+    from OpenGL.GL import *
+    _opengl_support = True
+except Exception as e:
+    _opengl_support = False
+    _log_message(_logger, "DEBUG", "GLU tesselator not available, using the "
+                                   "ear-clipping triangulation: {}".format(e))
+
+
+__all__ = [
+    "BoxSampler", "DiskSampler", "RejectionSampler", "TriangleSampler",
+    "parallel_sample", "poisson_disk_sample", "rnd_pts_in_tr", "triangulate",
+    "triangulate_mesh"
+]
+
+
+def triangulate(polygon, engine=None):
     """
     Returns a triangulation of `polygon`.
 
+    .. versionchanged:: 0.7
+        Added the `engine` argument.
+
     Parameters
     ----------
     polygon : a :class:`Shape` object or a :class:`~shapely.geometry.Polygon`
         or a :class:`~shapely.geometry.MultiPolygon` which will be decomposed
         into triangles.
+    engine : str, optional (default: "glu" if available, else "earcut")
+        Triangulation engine, see :func:`triangulate_mesh`.
 
     Returns
     -------
     triangles : generator containing triplets of triangle vertices.
     """
+    vertices, faces = triangulate_mesh(polygon, engine=engine)
+
+    return ((vertices[i], vertices[j], vertices[k]) for i, j, k in faces)
+
+
+def triangulate_mesh(polygon, engine=None):
+    """
+    Returns a triangulation of `polygon` as vertex and face arrays.
+
+    .. versionadded:: 0.7
+
+    Parameters
+    ----------
+    polygon : a :class:`Shape` object or a :class:`~shapely.geometry.Polygon`
+        or a :class:`~shapely.geometry.MultiPolygon` which will be decomposed
+        into triangles.
+    engine : str, optional (default: "glu" if available, else "earcut")
+        Triangulation engine, either "glu" (PyOpenGL's tesselator) or
+        "earcut" (pure NumPy ear-clipping with hole bridging, which does not
+        require OpenGL).
+
+    Returns
+    -------
+    vertices : array of shape (N, 2)
+        Positions of the vertices.
+    faces : array of ints of shape (T, 3)
+        Indices of the vertices of each triangle.
+    """
+    polygon = _unwrap(polygon)
+
+    if engine is None:
+        engine = "glu" if _opengl_support else "earcut"
+
+    if engine == "glu":
+        if not _opengl_support:
+            raise RuntimeError("The 'glu' engine requires PyOpenGL.")
+        vertices = np.array(_glu_triangulate(polygon), dtype=float)
+        vertices = vertices.reshape(-1, 2)
+        faces    = np.arange(len(vertices), dtype=int).reshape(-1, 3)
+        return vertices, faces
+    elif engine == "earcut":
+        return _earcut(polygon)
+
+    raise ValueError("Invalid triangulation `engine`: '{}'.".format(engine))
+
+
+def rnd_pts_in_tr(triangles, num_points, rng=None):
+    '''
+    Generate random points in a set of triangles.
+
+    Parameters
+    ----------
+    triangles : list of :class:`shapely.geometry.Polygon` triangles or array
+        of shape (T, 3, 2) containing the vertices of the triangles.
+    num_points : number of points to generate.
+    rng : :class:`numpy.random.Generator` or seed, optional (default: None)
+        Random number generator (global NumPy state if None).
+
+    Returns
+    -------
+    points : np.array of shape (`num_points`, 2)
+
+    See also
+    --------
+    :class:`TriangleSampler` to avoid recomputing the triangle areas and
+    alias table for each call.
+    '''
+    if not isinstance(triangles, np.ndarray):
+        triangles = np.array([t.exterior.coords for t in triangles])
+
+    return TriangleSampler(triangles).sample(num_points, rng=rng)
+
+
+class TriangleSampler(object):
+
+    '''
+    Uniform random point generator over a set of triangles.
+
+    The areas of the triangles and the associated Walker alias table are
+    computed once at creation, so that drawing a point only costs O(1)
+    operations, whatever the number of triangles.
+
+    .. versionadded:: 0.7
+    '''
+
+    def __init__(self, triangles, geometry=None, labels=None,
+                 num_labels=None):
+        '''
+        Create the sampler.
+
+        Parameters
+        ----------
+        triangles : array of shape (T, 3, 2)
+            Vertices of the triangles (additional vertices, such as the
+            closing point of a shapely ring, are ignored).
+        geometry : shapely geometry, optional (default: None)
+            Region covered by the triangles, used by :func:`contains`.
+        labels : array of T ints, optional (default: None)
+            Label of each triangle, from 0 to L - 1, used to sample a given
+            number of points per label with :func:`sample_labels`.
+            Triangles are reordered by label.
+        num_labels : int, optional (default: ``max(labels) + 1``)
+            Number of labels L (some labels may have no triangles).
+        '''
+        triangles = np.asarray(triangles, dtype=float)[:, :3, :2]
+        self.geometry = geometry
+
+        if labels is not None:
+            labels    = np.asarray(labels, dtype=int)
+            order     = np.argsort(labels, kind="stable")
+            triangles = triangles[order]
+            labels    = labels[order]
+
+        ab = triangles[:, 1] - triangles[:, 0]
+        ac = triangles[:, 2] - triangles[:, 0]
+
+        self.triangles = triangles
+        self.areas     = 0.5*np.abs(ab[:, 0]*ac[:, 1] - ab[:, 1]*ac[:, 0])
+        self.area      = float(np.sum(self.areas))
+
+        if len(triangles) == 0 or self.area <= 0:
+            raise ValueError("Cannot sample points from an empty set of "
+                             "triangles.")
+
+        self._prob, self._alias = _alias_table(self.areas)
+
+        vertices    = triangles.reshape(-1, 2)
+        self.bounds = tuple(np.concatenate(
+            (vertices.min(axis=0), vertices.max(axis=0))))
+
+        #: Label of each triangle (None if no labels were provided).
+        self.labels      = labels
+        #: Total area associated to each label.
+        self.label_areas = None
+
+        if labels is not None:
+            self._label_tables(
+                labels.max() + 1 if num_labels is None else num_labels)
+
+    def __len__(self):
+        return len(self.triangles)
+
+    def _label_tables(self, num_labels):
+        '''
+        Build one alias table per label over the contiguous segment of
+        triangles bearing this label.
+        '''
+        labels = self.labels
+        ids    = np.arange(num_labels)
+
+        self._starts     = np.searchsorted(labels, ids)
+        self._stops      = np.searchsorted(labels, ids, side="right")
+        self.label_areas = np.bincount(labels, weights=self.areas,
+                                       minlength=num_labels)
+
+        self._label_prob  = np.ones(len(labels))
+        self._label_alias = np.arange(len(labels))
+
+        for start, stop, area in zip(self._starts, self._stops,
+                                     self.label_areas):
+            if stop > start and area > 0:
+                prob, alias = _alias_table(self.areas[start:stop])
+                self._label_prob[start:stop]  = prob
+                self._label_alias[start:stop] = alias + start
+
+    def contains(self, x, y):
+        ''' Vectorized test of whether points (x, y) are in the region. '''
+        if self.geometry is None:
+            raise RuntimeError("`geometry` was not provided.")
+        return _contains_xy(self.geometry, x, y)
+
+    def sample(self, num_points, rng=None, out=None):
+        '''
+        Generate `num_points` random points uniformly distributed over the
+        triangles.
+
+        Parameters
+        ----------
+        num_points : int
+            Number of points.
+        rng : :class:`numpy.random.Generator` or seed, optional
+            Random number generator (global NumPy state if None).
+        out : array of shape (`num_points`, 2), optional (default: None)
+            Array where the points are written.
+
+        Returns
+        -------
+        points : np.array of shape (`num_points`, 2)
+        '''
+        rng    = _get_rng(rng)
+        num_tr = len(self._prob)
+
+        # choose triangles from the alias table
+        r0, r1 = rng.random((2, num_points))
+
+        idx = np.minimum((r0*num_tr).astype(int), num_tr - 1)
+        idx = np.where(r1 < self._prob[idx], idx, self._alias[idx])
+
+        return self._points_in(idx, rng, out)
+
+    def sample_labels(self, counts, rng=None, out=None):
+        '''
+        Generate ``counts[i]`` random points uniformly distributed over the
+        triangles of label i, for all labels at once.
+
+        Parameters
+        ----------
+        counts : array of L ints
+            Number of points for each label.
+        rng : :class:`numpy.random.Generator` or seed, optional
+            Random number generator (global NumPy state if None).
+        out : array of shape (``sum(counts)``, 2), optional (default: None)
+            Array where the points are written.
+
+        Returns
+        -------
+        points : np.array of shape (``sum(counts)``, 2)
+            Points, grouped by label.
+        labels : np.array of ``sum(counts)`` ints
+            Label of each point.
+        '''
+        if self.labels is None:
+            raise RuntimeError("The sampler was created without `labels`.")
+
+        counts = np.asarray(counts, dtype=int)
+
+        assert len(counts) == len(self.label_areas), \
+            "One count per label is required."
+
+        if np.any((counts > 0) & (self.label_areas <= 0)):
+            raise ValueError("Cannot sample points for a label with no "
+                             "surface.")
+
+        rng    = _get_rng(rng)
+        labels = np.repeat(np.arange(len(counts)), counts)
+        start  = self._starts[labels]
+        size   = self._stops[labels] - start
+
+        # choose triangles from the alias table of each label
+        r0, r1 = rng.random((2, len(labels)))
+
+        idx = start + np.minimum((r0*size).astype(int), size - 1)
+        idx = np.where(r1 < self._label_prob[idx], idx, self._label_alias[idx])
+
+        return self._points_in(idx, rng, out), labels
+
+    def _points_in(self, idx, rng, out):
+        ''' Generate one random point in each of the triangles `idx`. '''
+        num_points = len(idx)
+        chosen     = self.triangles[idx]
+
+        r1, r2 = rng.random((2, num_points))
+        sq_r1  = np.sqrt(r1)[:, None]
+        r2     = r2[:, None]
+
+        points = np.empty((num_points, 2)) if out is None else out
+
+        np.multiply(chosen[:, 0, :], 1 - sq_r1, out=points)
+        points += chosen[:, 1, :]*(sq_r1*(1 - r2))
+        points += chosen[:, 2, :]*(sq_r1*r2)
+
+        return points
+
+
+class RejectionSampler(object):
+
+    '''
+    Uniform random point generator over a Polygon or MultiPolygon, drawing
+    candidates in its bounding box and rejecting those outside.
+
+    Candidates are tested by batches and the size of the batches adapts to
+    the acceptance rate observed during the call, so that large seedings
+    only require a few vectorized passes, even for thin or porous regions.
+
+    .. versionadded:: 0.7
+    '''
+
+    #: Minimal and maximal number of candidates tested at once.
+    min_batch = 64
+    max_batch = 2**20
+
+    def __init__(self, geometry):
+        '''
+        Create the sampler.
+
+        Parameters
+        ----------
+        geometry : :class:`~shapely.geometry.Polygon` or MultiPolygon
+            Region where the points should be generated.
+        '''
+        if geometry.is_empty or geometry.area <= 0:
+            raise ValueError("Cannot sample points from an empty region.")
+
+        self.geometry = geometry
+        self.bounds   = geometry.bounds
+        self.area     = geometry.area
+
+        xmin, ymin, xmax, ymax = self.bounds
+
+        #: Expected acceptance rate (area ratio with the bounding box).
+        self.acceptance = self.area / ((xmax - xmin)*(ymax - ymin))
+
+    def contains(self, x, y):
+        ''' Vectorized test of whether points (x, y) are in the region. '''
+        return _contains_xy(self.geometry, x, y)
+
+    def sample(self, num_points, rng=None, out=None):
+        '''
+        Generate `num_points` random points uniformly distributed over the
+        region.
+
+        Parameters
+        ----------
+        num_points : int
+            Number of points.
+        rng : :class:`numpy.random.Generator` or seed, optional
+            Random number generator (global NumPy state if None).
+        out : array of shape (`num_points`, 2), optional (default: None)
+            Array where the points are written.
+
+        Returns
+        -------
+        points : np.array of shape (`num_points`, 2)
+        '''
+        rng = _get_rng(rng)
+
+        xmin, ymin, xmax, ymax = self.bounds
+
+        points    = np.empty((num_points, 2)) if out is None else out
+        num_valid = 0
+
+        # statistics start from the expected acceptance rate
+        drawn, accepted = 1., self.acceptance
+
+        while num_valid < num_points:
+            missing = num_points - num_valid
+            # aim slightly above the expected number of required candidates
+            batch = int(np.clip(1.2*missing*drawn / max(accepted, 1e-6),
+                                self.min_batch, self.max_batch))
+
+            xx = rng.uniform(xmin, xmax, batch)
+            yy = rng.uniform(ymin, ymax, batch)
+
+            valid = np.flatnonzero(_contains_xy(self.geometry, xx, yy))
+
+            drawn    += batch
+            accepted += len(valid)
+
+            valid = valid[:missing]
+            new   = len(valid)
+
+            points[num_valid:num_valid + new, 0] = xx[valid]
+            points[num_valid:num_valid + new, 1] = yy[valid]
+
+            num_valid += new
+
+        return points
+
+
+class BoxSampler(object):
+
+    '''
+    Uniform random point generator inside an axis-aligned rectangle.
+
+    .. versionadded:: 0.7
+    '''
+
+    def __init__(self, xmin, ymin, xmax, ymax):
+        self.bounds = (xmin, ymin, xmax, ymax)
+        self.area   = (xmax - xmin)*(ymax - ymin)
+
+    def contains(self, x, y):
+        ''' Vectorized test of whether points (x, y) are in the region. '''
+        xmin, ymin, xmax, ymax = self.bounds
+        return (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)
+
+    def sample(self, num_points, rng=None, out=None):
+        ''' See :func:`TriangleSampler.sample`. '''
+        rng = _get_rng(rng)
+
+        xmin, ymin, xmax, ymax = self.bounds
+
+        points = np.empty((num_points, 2)) if out is None else out
+
+        points[:, 0] = rng.uniform(xmin, xmax, size=num_points)
+        points[:, 1] = rng.uniform(ymin, ymax, size=num_points)
+
+        return points
+
+
+class DiskSampler(object):
+
+    '''
+    Uniform random point generator inside a disk.
+
+    .. versionadded:: 0.7
+    '''
+
+    def __init__(self, centroid, radius):
+        self.centroid = np.asarray(centroid, dtype=float)
+        self.radius   = radius
+        self.area     = np.pi*radius*radius
+        self.bounds   = (self.centroid[0] - radius, self.centroid[1] - radius,
+                         self.centroid[0] + radius, self.centroid[1] + radius)
+
+    def contains(self, x, y):
+        ''' Vectorized test of whether points (x, y) are in the region. '''
+        # same precaution as in `sample`
+        r2 = 0.99*self.radius*self.radius
+        return np.square(x - self.centroid[0]) \
+               + np.square(y - self.centroid[1]) <= r2
+
+    def sample(self, num_points, rng=None, out=None):
+        ''' See :func:`TriangleSampler.sample`. '''
+        rng = _get_rng(rng)
+
+        theta = rng.uniform(0, 2*np.pi, size=num_points)
+        # take some precaution to stay inside the shape
+        r = self.radius*np.sqrt(rng.uniform(0, 0.99, size=num_points))
+
+        points = np.empty((num_points, 2)) if out is None else out
+
+        points[:, 0] = r*np.cos(theta) + self.centroid[0]
+        points[:, 1] = r*np.sin(theta) + self.centroid[1]
+
+        return points
+
+
+def parallel_sample(sampler, num_points, rng=None, num_threads=None,
+                    chunk_size=2**18, out=None):
+    '''
+    Generate points with `sampler` using a pool of threads.
+
+    The points are generated by chunks of `chunk_size`, each with its own
+    random stream derived from `rng` through :func:`~PyNCulture.spawn`, and
+    written into a single output array. The result therefore only depends
+    on `rng` and `chunk_size`, not on the number of threads or on their
+    scheduling.
+    NumPy releases the GIL in the sampling kernels, so that threads share
+    the precomputed tables of the sampler without copying them.
+
+    .. versionadded:: 0.7
+
+    Parameters
+    ----------
+    sampler : sampler object
+        Any sampler of this module (e.g. :class:`TriangleSampler`).
+    num_points : int
+        Number of points.
+    rng : :class:`numpy.random.Generator` or seed, optional (default: None)
+        Source of the random streams (global NumPy state if None).
+    num_threads : int, optional (default: number of CPUs)
+        Number of threads in the pool.
+    chunk_size : int, optional (default: 2**18)
+        Number of points generated by each task.
+    out : array of shape (`num_points`, 2), optional (default: None)
+        Preallocated output array.
+
+    Returns
+    -------
+    points : np.array of shape (`num_points`, 2)
+    '''
+    from concurrent.futures import ThreadPoolExecutor
+
+    points = np.empty((num_points, 2)) if out is None else out
+    starts = list(range(0, num_points, chunk_size))
+    rngs   = spawn(len(starts), _get_rng(rng))
+
+    def _sample_chunk(i):
+        start = starts[i]
+        stop  = min(start + chunk_size, num_points)
+        sampler.sample(stop - start, rng=rngs[i], out=points[start:stop])
+
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        # consume the iterator to propagate exceptions
+        list(executor.map(_sample_chunk, range(len(starts))))
+
+    return points
+
+
+def poisson_disk_sample(sampler, num_points, min_distance, rng=None,
+                        max_tries=30):
+    '''
+    Generate points with `sampler` such that no two points are closer than
+    `min_distance` (hard-core or Poisson-disk process).
+
+    Points are first obtained by dart throwing: uniform candidates from
+    `sampler` are drawn by batches and kept if they do not conflict with
+    previous points, which are stored in a background grid of cell size
+    ``min_distance / sqrt(2)`` (at most one point per cell).
+    Once this becomes inefficient, the packing is completed by Bridson's
+    algorithm, drawing `max_tries` candidates in the annulus
+    [`min_distance`, 2 `min_distance`] around active points.
+    The total cost is therefore close to linear in the number of points.
+
+    .. versionadded:: 0.7
+
+    Parameters
+    ----------
+    sampler : sampler object
+        Sampler of this module; it must implement `contains` and `bounds`.
+    num_points : int
+        Number of points.
+    min_distance : float
+        Minimal distance between two points.
+    rng : :class:`numpy.random.Generator` or seed, optional (default: None)
+        Random number generator (global NumPy state if None).
+    max_tries : int, optional (default: 30)
+        Number of candidates drawn around each active point in Bridson's
+        phase.
+
+    Returns
+    -------
+    points : np.array of shape (`num_points`, 2)
+
+    Raises
+    ------
+    RuntimeError if the region cannot contain `num_points` points separated
+    by `min_distance`.
+    '''
+    from scipy.spatial import cKDTree
+
+    rng = _get_rng(rng)
+
+    r  = float(min_distance)
+    r2 = r*r
+    h  = r / np.sqrt(2)
+
+    xmin, ymin, xmax, ymax = sampler.bounds
+
+    nx = int(np.ceil((xmax - xmin) / h)) + 1
+    ny = int(np.ceil((ymax - ymin) / h)) + 1
+
+    # grid is padded by 2 cells on each side to avoid bound checks
+    grid   = np.full((nx + 4, ny + 4), -1, dtype=np.int64)
+    points = np.empty((num_points, 2))
+    num    = 0
+
+    offsets = np.array([(i, j) for i in range(-2, 3) for j in range(-2, 3)])
+
+    def _cells(xy):
+        ci = ((xy[:, 0] - xmin) / h).astype(np.int64) + 2
+        cj = ((xy[:, 1] - ymin) / h).astype(np.int64) + 2
+        return np.clip(ci, 2, nx + 1), np.clip(cj, 2, ny + 1)
+
+    def _free(xy):
+        # no conflict with the points already in the grid
+        ci, cj = _cells(xy)
+        neighb = grid[ci[:, None] + offsets[:, 0], cj[:, None] + offsets[:, 1]]
+        others = points[np.maximum(neighb, 0)]
+        dist2  = np.sum(np.square(others - xy[:, None, :]), axis=2)
+        return ~np.any((neighb >= 0) & (dist2 < r2), axis=1)
+
+    def _add(xy):
+        nonlocal num
+        ci, cj = _cells(xy)
+        new    = len(xy)
+        grid[ci, cj] = np.arange(num, num + new)
+        points[num:num + new] = xy
+        num += new
+
+    # dart throwing
+    expected = sampler.area / (np.pi*r2)
+
+    while num < num_points:
+        missing = num_points - num
+        batch   = int(np.clip(min(missing, expected), 16, 2**16))
+        cand    = sampler.sample(batch, rng=rng)
+        cand    = cand[_free(cand)]
+
+        if len(cand) > 1:
+            # resolve conflicts inside the batch, keeping the first points
+            keep  = np.ones(len(cand), dtype=bool)
+            pairs = cKDTree(cand).query_pairs(r, output_type="ndarray")
+            pairs = np.sort(pairs, axis=1)
+            for a, b in pairs[np.argsort(pairs[:, 1], kind="stable")]:
+                if keep[a]:
+                    keep[b] = False
+            cand = cand[keep]
+
+        cand = cand[:missing]
+
+        _add(cand)
+
+        if len(cand) < 0.01*batch:
+            break
+
+    # Bridson's algorithm to fill the remaining space
+    active = list(range(num))
+
+    while num < num_points and active:
+        i      = rng.choice(len(active))
+        center = points[active[i]]
+
+        rho   = r*np.sqrt(rng.uniform(1, 4, max_tries))
+        theta = rng.uniform(0, 2*np.pi, max_tries)
+        cand  = center + np.array([rho*np.cos(theta), rho*np.sin(theta)]).T
+
+        cand = cand[sampler.contains(cand[:, 0], cand[:, 1])]
+        cand = cand[_free(cand)] if len(cand) else cand
+
+        if len(cand):
+            _add(cand[:1])
+            active.append(num - 1)
+        else:
+            active[i] = active[-1]
+            active.pop()
+
+    if num < num_points:
+        raise RuntimeError(
+            "Could not place {} points separated by {}: the region is "
+            "saturated after {} points.".format(num_points, r, num))
+
+    return points
+
+
+def _alias_table(weights):
+    '''
+    Build the Walker alias table associated to `weights` (Vose's method).
+
+    Returns
+    -------
+    prob : array of floats
+        Probability to keep the drawn index.
+    alias : array of ints
+        Index to use if the drawn index is rejected.
+    '''
+    num   = len(weights)
+    prob  = (np.asarray(weights, dtype=float) * num / np.sum(weights)).tolist()
+    alias = list(range(num))
+
+    small = [i for i, p in enumerate(prob) if p < 1.]
+    large = [i for i, p in enumerate(prob) if p >= 1.]
+
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+
+        alias[s] = l
+        prob[l]  = prob[l] + prob[s] - 1.
+
+        if prob[l] < 1.:
+            small.append(l)
+        else:
+            large.append(l)
+
+    # remaining entries are 1 up to rounding errors
+    for i in small + large:
+        prob[i] = 1.
+
+    return np.array(prob), np.array(alias, dtype=int)
+
+
+# polygon tesselation
+
+def _glu_tesselate(tess, polygon):
+    gluTessBeginContour(tess)
+    for point in polygon.exterior.coords:
+        point3d = (point[0], point[1], 0)
+        gluTessVertex(tess, point3d, point3d)
+    gluTessEndContour(tess)
+    # then handle each of the holes, if applicable
+    for hole in polygon.interiors:
+        gluTessBeginContour(tess)
+        for point in hole.coords:
+            point3d = (point[0], point[1], 0)
+            gluTessVertex(tess, point3d, point3d)
+        gluTessEndContour(tess)
+
+
+def _glu_triangulate(polygon):
+    '''
+    Triangulate `polygon` with the GLU tesselator, returning the list of the
+    vertices (three consecutive entries per triangle).
+    '''
     vertices = []
-    
+
     # opengl callbacks
     def _edgeFlagCallback(param1, param2): pass
 
@@ -73,69 +779,475 @@ def triangulate(polygon):
 
     # first handle the main polygon(s)
     if isinstance(polygon, Polygon):
-        _tesselate(tess, polygon)
+        _glu_tesselate(tess, polygon)
     elif isinstance(polygon, MultiPolygon):
         for p in polygon.geoms:
-            _tesselate(tess, p)
+            _glu_tesselate(tess, p)
 
     # finish polygon and remove tesselator
     gluTessEndPolygon(tess)
     gluDeleteTess(tess)
 
-    return ((vertices[i], vertices[i+1], vertices[i+2])
-            for i in range(0, len(vertices), 3))
+    return vertices
+
 
+# ear-clipping triangulation
 
-def rnd_pts_in_tr(triangles, num_points):
+def _earcut(polygon):
     '''
-    Generate random points in a set of triangles.
+    Triangulate a Polygon or MultiPolygon (with holes) by ear-clipping.
 
-    Parameters
-    ----------
-    triangles : list of :class:`shapely.geometry.Polygon` triangles
-    num_points : number of points to generate.
+    The holes are first bridged to the exterior so that each polygon becomes
+    a single (weakly simple) ring, which is then decomposed into triangles.
+    Since each bridge requires a pass over the ring, polygons with more than
+    `_earcut_max_holes` holes are first cut into tiles.
+    '''
+    polygons = polygon.geoms if isinstance(polygon, MultiPolygon) \
+               else [polygon]
+
+    vertices, faces = [], []
+    offset = 0
+
+    for p in (tile for p in polygons for tile in _split_holes(p)):
+        if p.is_empty:
+            continue
+
+        outer = _clean_ring(p.exterior.coords, ccw=True)
+        holes = [_clean_ring(h.coords, ccw=False) for h in p.interiors]
+        ring  = _bridge_holes(outer, [h for h in holes if len(h) > 2])
+
+        vertices.append(ring)
+        faces.append(_clip_ears(ring) + offset)
+
+        offset += len(ring)
+
+    if not vertices:
+        return np.zeros((0, 2)), np.zeros((0, 3), dtype=int)
+
+    return np.concatenate(vertices), np.concatenate(faces)
+
+
+def _split_holes(polygon):
+    '''
+    Cut `polygon` in halves along the largest dimension of its bounding box
+    until each piece has at most `_earcut_max_holes` holes.
+    '''
+    if len(polygon.interiors) <= _earcut_max_holes:
+        return [polygon]
+
+    xmin, ymin, xmax, ymax = polygon.bounds
+
+    if xmax - xmin >= ymax - ymin:
+        xmid   = 0.5*(xmin + xmax)
+        halves = [(xmin, ymin, xmid, ymax), (xmid, ymin, xmax, ymax)]
+    else:
+        ymid   = 0.5*(ymin + ymax)
+        halves = [(xmin, ymin, xmax, ymid), (xmin, ymid, xmax, ymax)]
+
+    pieces = []
+
+    for half in halves:
+        piece = clip_by_rect(polygon, *half)
+
+        for p in getattr(piece, "geoms", [piece]):
+            if isinstance(p, Polygon) and not p.is_empty:
+                pieces.extend(_split_holes(p))
+
+    return pieces
+
+
+def _clean_ring(coords, ccw=True):
+    '''
+    Return the vertices of an open ring without consecutive duplicates,
+    oriented counter-clockwise if `ccw` is True, clockwise otherwise.
+    '''
+    ring = np.asarray(coords, dtype=float)[:, :2]
+
+    # remove consecutive duplicates (including the closing point)
+    keep = np.any(ring != np.roll(ring, 1, axis=0), axis=1)
+    ring = ring[keep]
+
+    x, y = ring[:, 0], ring[:, 1]
+    signed_area = np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)
+
+    if (signed_area > 0) != ccw:
+        ring = ring[::-1]
+
+    return ring
+
+
+def _bridge_holes(outer, holes):
+    '''
+    Merge the (clockwise) holes into the (counter-clockwise) outer ring.
+
+    Holes sharing a vertex with the ring are spliced into it at this vertex;
+    the others are connected to a visible vertex, starting from the holes
+    with the rightmost vertices.
+    '''
+    holes   = sorted(holes, key=lambda h: -h[:, 0].max())
+    pending = set(range(len(holes)))
+    owners  = {}
+
+    for i, hole in enumerate(holes):
+        for point in map(tuple, hole.tolist()):
+            owners.setdefault(point, []).append(i)
+
+    ring = _splice_touching(outer, outer, holes, owners, pending)
+
+    for i, hole in enumerate(holes):
+        if i in pending:
+            pending.discard(i)
+
+            m    = np.argmax(hole[:, 0])
+            hole = np.roll(hole, -m, axis=0)
+            k    = _find_bridge(ring, hole[0])
+            ring = np.concatenate((ring[:k + 1], hole, hole[:1], ring[k:]))
+            ring = _splice_touching(ring, hole, holes, owners, pending)
+
+    return ring
+
+
+def _splice_touching(ring, points, holes, owners, pending):
+    '''
+    Splice into `ring` the pending holes which share a vertex with `points`
+    (the vertices that were just added to the ring), then those touching
+    them, and so on.
+    '''
+    stack = list(map(tuple, points.tolist()))
+
+    while stack:
+        point = stack.pop()
+
+        for i in owners.get(point, ()):
+            if i not in pending:
+                continue
+
+            pending.discard(i)
+
+            hole = holes[i]
+            j    = np.flatnonzero(np.all(hole == point, axis=1))[0]
+            hole = np.roll(hole, -j, axis=0)
+
+            # the hole goes in the ring's copy of the vertex whose interior
+            # sector contains the hole, so aim along the bisector of the
+            # hole's own sector (from the previous to the next vertex)
+            start = np.arctan2(*(hole[-1] - hole[0])[::-1])
+            span  = (np.arctan2(*(hole[1] - hole[0])[::-1]) - start) \
+                    % (2*np.pi)
+            angle = start + 0.5*(span if span > 0 else 2*np.pi)
+            dist  = np.linalg.norm(hole[1] - hole[0])
+            aim   = hole[0] + dist*np.array([np.cos(angle), np.sin(angle)])
+
+            k = np.flatnonzero(np.all(ring == point, axis=1))[0]
+            k = _pick_copy(ring, k, aim)
+
+            ring = np.concatenate((ring[:k + 1], hole[1:], hole[:1],
+                                   ring[k + 1:]))
+
+            stack.extend(map(tuple, hole.tolist()))
+
+    return ring
+
+
+def _find_bridge(ring, point):
+    '''
+    Find a vertex of `ring` visible from `point` (rightmost vertex of a hole)
+    by casting a ray towards increasing x values.
+    '''
+    mx, my = point
+    x, y   = ring[:, 0], ring[:, 1]
+    nx, ny = np.roll(x, -1), np.roll(y, -1)
+
+    # edges crossing the horizontal line through the point
+    straddle = (((y <= my) & (ny >= my)) | ((y >= my) & (ny <= my))) \
+               & (y != ny)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t  = (my - y) / (ny - y)
+        xi = x + t*(nx - x)
+
+    straddle &= (xi >= mx)
+
+    if not np.any(straddle):
+        raise ValueError("Could not bridge a hole to the exterior ring.")
+
+    edge = np.argmin(np.where(straddle, xi, np.inf))
+    qx   = xi[edge]
+
+    # candidate: endpoint of the edge with largest x
+    k = edge if x[edge] >= nx[edge] else (edge + 1) % len(ring)
+
+    if qx == mx or (x[k] == qx and y[k] == my):
+        return k
+
+    # other vertices inside the triangle (M, I, P) could hide P, in that case
+    # take the one with the smallest angle with respect to the ray
+    px, py = x[k], y[k]
+
+    inside = _in_triangle(mx, my, qx, my, px, py, x, y) & (x > mx)
+    inside[k] = False
+
+    if np.any(inside):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tan = np.abs(y - my) / (x - mx)
+
+        candidates = np.flatnonzero(inside)
+        order      = np.lexsort((x[candidates], tan[candidates]))
+        k          = candidates[order[0]]
+
+    return _pick_copy(ring, k, point)
+
+
+def _pick_copy(ring, k, point):
+    '''
+    If the vertex `k` appears several times in `ring` (because of previous
+    bridges), return the copy whose interior sector contains `point`.
+    '''
+    copies = np.flatnonzero(np.all(ring == ring[k], axis=1))
+
+    if len(copies) == 1:
+        return k
+
+    n = len(ring)
+
+    for j in copies:
+        # closest distinct neighbours
+        a = (j - 1) % n
+        while a != j and np.all(ring[a] == ring[j]):
+            a = (a - 1) % n
+
+        c = (j + 1) % n
+        while c != j and np.all(ring[c] == ring[j]):
+            c = (c + 1) % n
+
+        # the interior of a counter-clockwise ring goes from the direction of
+        # the next vertex to that of the previous one (counter-clockwise)
+        start  = np.arctan2(*(ring[c] - ring[j])[::-1])
+        end    = (np.arctan2(*(ring[a] - ring[j])[::-1]) - start) % (2*np.pi)
+        target = (np.arctan2(*(point - ring[j])[::-1]) - start) % (2*np.pi)
+
+        if target <= (end if end > 0 else 2*np.pi):
+            return j
+
+    return k
+
+
+def _clip_ears(ring):
+    '''
+    Decompose a counter-clockwise, weakly simple ring into triangles.
+
+    Only the reflex vertices can lie inside an ear, so the ear tests only
+    visit the reflex vertices that are still part of the ring, which are
+    stored in a spatial hash (a dict of grid cells) and removed from it as
+    soon as they are clipped or become convex.
+    Vertices appearing several times in the ring (bridges and vertices
+    shared by several rings) stay in the hash until they are clipped.
+    Vertices lying on the border of a candidate ear (up to rounding errors),
+    such as the other copies of its corners, only reject it if one of their
+    edges enters the triangle.
 
     Returns
     -------
-    points : np.array of shape (`num_points`, 2)
+    faces : array of ints of shape (len(ring) - 2, 3) at most.
     '''
-    # normalized areas
-    areas = [t.area for t in triangles]
-    areas = np.array(areas) / np.sum(areas)
-    # vertices and triangle ids
-    verts = np.array([t.exterior.coords for t in triangles])
-    idx   = np.arange(0, len(triangles), dtype=int)
+    n = len(ring)
 
-    # choose triangle based on its area
-    chosen_idx = np.random.choice(idx, size=num_points, p=areas)
-    chosen     = verts[chosen_idx]
+    if n < 3:
+        return np.zeros((0, 3), dtype=int)
 
-    # generate random points inside these triangles
-    r1, r2 = np.random.rand(2, num_points)
+    x0, y0 = ring.min(axis=0)
+    x1, y1 = ring.max(axis=0)
 
-    As = chosen[:, 0, :]
-    Bs = chosen[:, 1, :]
-    Cs = chosen[:, 2, :]
+    # tolerance for collinear vertices
+    scale = max(x1 - x0, y1 - y0)
+    eps   = 1e-14*scale*scale
 
-    points = (As.T*(1 - np.sqrt(r1))).T \
-             + (Bs.T*(np.sqrt(r1)*(1 - r2))).T \
-             + (Cs.T*(np.sqrt(r1)*r2)).T
+    # initial convexity of the vertices
+    rx, ry = np.roll(ring, 1, axis=0).T
+    nx, ny = np.roll(ring, -1, axis=0).T
+    cross  = (ring[:, 0] - rx)*(ny - ry) - (ring[:, 1] - ry)*(nx - rx)
+    _, inverse, counts = np.unique(
+        ring, axis=0, return_inverse=True, return_counts=True)
 
-    return points
+    shared = counts[inverse.ravel()] > 1
+    hashed = np.flatnonzero((cross <= eps) | shared)
+    shared = shared.tolist()
 
+    # spatial hash with about four hashed vertices per cell
+    num_cells = max(0.25*len(hashed), 1)
+    size      = np.sqrt(max((x1 - x0)*(y1 - y0), 1e-300) / num_cells)
+    size      = max(size, 1e-6*scale, 1e-300)
+    cols      = int((x1 - x0) / size) + 1
 
-# polygon tesselation
+    x, y = ring[:, 0].tolist(), ring[:, 1].tolist()
+    prev = np.roll(np.arange(n), 1).tolist()
+    nxt  = np.roll(np.arange(n), -1).tolist()
 
-def _tesselate(tess, polygon):
-    gluTessBeginContour(tess)
-    for point in polygon.exterior.coords:
-        point3d = (point[0], point[1], 0)
-        gluTessVertex(tess, point3d, point3d)
-    gluTessEndContour(tess)
-    # then handle each of the holes, if applicable
-    for hole in polygon.interiors:
-        gluTessBeginContour(tess)
-        for point in hole.coords:
-            point3d = (point[0], point[1], 0)
-            gluTessVertex(tess, point3d, point3d)
-        gluTessEndContour(tess)
+    cells   = {}
+    cell_of = [None]*n
+
+    def _cell(k):
+        return int((x[k] - x0) / size) + cols*int((y[k] - y0) / size)
+
+    def _hash(k):
+        cell_of[k] = _cell(k)
+        cells.setdefault(cell_of[k], []).append(k)
+
+    def _unhash(k):
+        cells[cell_of[k]].remove(k)
+        cell_of[k] = None
+
+    for k in hashed.tolist():
+        _hash(k)
+
+    def _cross(k):
+        a, c = prev[k], nxt[k]
+        return (x[k] - x[a])*(y[c] - y[a]) - (y[k] - y[a])*(x[c] - x[a])
+
+    def _is_ear(a, b, c):
+        ax, ay, bx, by, cx, cy = x[a], y[a], x[b], y[b], x[c], y[c]
+
+        xmin, xmax = min(ax, bx, cx), max(ax, bx, cx)
+        ymin, ymax = min(ay, by, cy), max(ay, by, cy)
+
+        i0, i1 = int((xmin - x0) / size), int((xmax - x0) / size)
+        j0, j1 = int((ymin - y0) / size), int((ymax - y0) / size)
+
+        for j in range(j0, j1 + 1):
+            for i in range(cols*j + i0, cols*j + i1 + 1):
+                for p in cells.get(i, ()):
+                    px, py = x[p], y[p]
+
+                    if px < xmin or px > xmax or py < ymin or py > ymax:
+                        continue
+
+                    if p == a or p == b or p == c:
+                        continue
+
+                    d1 = (bx - ax)*(py - ay) - (by - ay)*(px - ax)
+                    d2 = (cx - bx)*(py - by) - (cy - by)*(px - bx)
+                    d3 = (ax - cx)*(py - cy) - (ay - cy)*(px - cx)
+
+                    if d1 < -eps or d2 < -eps or d3 < -eps:
+                        continue
+
+                    if d1 > eps and d2 > eps and d3 > eps:
+                        return False
+
+                    # vertices on the border (including the copies of the
+                    # corners) only block the ear if one of their edges
+                    # enters the triangle
+                    edges = [e for d, e in ((d1, (bx - ax, by - ay)),
+                                            (d2, (cx - bx, cy - by)),
+                                            (d3, (ax - cx, ay - cy)))
+                             if d <= eps]
+
+                    if _enters(p, edges):
+                        return False
+
+        return True
+
+    def _enters(p, edges):
+        # whether an edge of `p` goes strictly on the inner side of all the
+        # triangle `edges` on which `p` lies
+        px, py = x[p], y[p]
+
+        for step in (prev, nxt):
+            k = step[p]
+
+            # skip other copies of `p`
+            while k != p and x[k] == px and y[k] == py:
+                k = step[k]
+
+            dx, dy = x[k] - px, y[k] - py
+
+            if all(ex*dy - ey*dx > eps for ex, ey in edges):
+                return True
+
+        return False
+
+    def _is_spike(a, b, c):
+        # whether the edges of the flat vertex `b` go back on each other
+        return (x[a] - x[b])*(x[c] - x[b]) + (y[a] - y[b])*(y[c] - y[b]) >= 0
+
+    def _clip(b):
+        a, c = prev[b], nxt[b]
+
+        nxt[a], prev[c] = c, a
+
+        if cell_of[b] is not None:
+            _unhash(b)
+
+        # only the neighbours can change convexity
+        for k in (a, c):
+            convex = _cross(k) > eps and not shared[k]
+            if convex and cell_of[k] is not None:
+                _unhash(k)
+            elif not convex and cell_of[k] is None:
+                _hash(k)
+
+        return a
+
+    faces     = []
+    remaining = n
+    current   = 0
+    stalled   = 0
+
+    while remaining > 3:
+        a, b, c = prev[current], current, nxt[current]
+
+        cross  = _cross(b)
+        is_ear = cross > eps and _is_ear(a, b, c)
+
+        # a flat vertex is dropped unless the new edge would go through
+        # another copy of it
+        flat = abs(cross) <= eps and (not shared[b] or _is_spike(a, b, c))
+
+        if is_ear or flat:
+            # clip the ear (or drop the degenerate vertex)
+            if is_ear:
+                faces.append((a, b, c))
+            current    = _clip(b)
+            remaining -= 1
+            stalled    = 0
+        else:
+            current  = c
+            stalled += 1
+
+            if stalled > remaining:
+                # numerical issues: force the clipping of the most convex
+                # vertex to guarantee termination
+                best, best_cross = current, -np.inf
+
+                for _ in range(remaining):
+                    k_cross = _cross(current)
+                    if k_cross > best_cross:
+                        best, best_cross = current, k_cross
+                    current = nxt[current]
+
+                if best_cross <= 0:
+                    raise ValueError("Ear-clipping failed: invalid polygon.")
+
+                faces.append((prev[best], best, nxt[best]))
+                current    = _clip(best)
+                remaining -= 1
+                stalled    = 0
+
+    # last triangle
+    if _cross(current) > eps:
+        faces.append((prev[current], current, nxt[current]))
+
+    return np.array(faces, dtype=int).reshape(-1, 3)
+
+
+def _in_triangle(ax, ay, bx, by, cx, cy, px, py):
+    '''
+    Boolean mask of the points (px, py) inside (or on the border of) the
+    triangle (a, b, c), regardless of its orientation.
+    '''
+    d1 = (bx - ax)*(py - ay) - (by - ay)*(px - ax)
+    d2 = (cx - bx)*(py - by) - (cy - by)*(px - bx)
+    d3 = (ax - cx)*(py - cy) - (ay - cy)*(px - cx)
+
+    return ((d1 >= 0) & (d2 >= 0) & (d3 >= 0)) | \
+           ((d1 <= 0) & (d2 <= 0) & (d3 <= 0))